@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: single-pass PatternMatcher vs the previous per-category
+regex loop in check_custom_guardrails.
+
+Run from backend/:
+    python benchmarks/guardrail_matcher.py [--terms 500] [--iterations 2000]
+
+Checks both implementations agree on every sample before timing them, then
+repeats with the shipped config padded out to --terms synthetic terms to show
+how each scales with the size of the pattern set.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_moderation.pattern_matcher import PatternMatcher
+from llm_moderation.guardrails import GUARDRAIL_PATTERNS_PATH
+
+SAMPLES = [
+    "What is the APR on the Aven card?",
+    "How do I make a payment through the app?",
+    "Can I use my home equity line to buy stock?",
+    "My lawyer says I should file a claim against the settlement",
+    "Is my social security number stored anywhere?",
+    "Should I move my Roth IRA into a different portfolio before retirement?",
+    "What's the credit limit and how is it determined based on home value?",
+    "Does Aven report to the credit bureaus every month, and how long does approval take?",
+    "I want to sue because my date of birth was wrong on the application",
+    "Tell me about the cashback rewards and whether there is an annual fee for the card",
+]
+
+
+def legacy_check(patterns, text):
+    """The previous implementation: one case-insensitive search per category"""
+    violations = []
+    for label, pattern in patterns.items():
+        if re.search(pattern, text, re.IGNORECASE):
+            violations.append(label)
+    return violations
+
+
+def legacy_patterns(categories):
+    return {
+        label: r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b"
+        for label, terms in categories.items()
+    }
+
+
+def pad_categories(categories, total_terms, seed=7):
+    """Adds random made-up words so the set has `total_terms` terms"""
+    rng = random.Random(seed)
+    padded = {label: list(terms) for label, terms in categories.items()}
+    labels = list(padded)
+    count = sum(len(terms) for terms in padded.values())
+    while count < total_terms:
+        word = "".join(rng.choice("bcdfghjklmnpqrstvwxz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+        padded[labels[count % len(labels)]].append(word)
+        count += 1
+    return padded
+
+
+def timed(fn, texts, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (iterations * len(texts)) * 1e6
+
+
+def run(categories, texts, iterations, title):
+    patterns = legacy_patterns(categories)
+    matcher = PatternMatcher(categories)
+    for text in texts:
+        old, new = legacy_check(patterns, text), matcher.match(text)
+        if old != new:
+            raise SystemExit(f"❌ Mismatch on {text!r}: legacy={old} matcher={new}")
+    print(f"\n✅ Both implementations agree on {len(texts)} samples")
+
+    legacy_us = timed(lambda t: legacy_check(patterns, t), texts, iterations)
+    matcher_us = timed(matcher.match, texts, iterations)
+    print(f"{title} ({matcher.term_count} terms, {len(categories)} categories)")
+    print(f"   legacy per-category re.search : {legacy_us:8.2f} µs/message")
+    print(f"   single-pass PatternMatcher    : {matcher_us:8.2f} µs/message")
+    print(f"   speedup                       : {legacy_us / matcher_us:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=500, help="size of the padded pattern set")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(GUARDRAIL_PATTERNS_PATH, "r", encoding="utf-8") as f:
+        categories = json.load(f)
+
+    # Longer messages stress the per-character cost, not just call overhead
+    texts = SAMPLES + [" ".join(SAMPLES)]
+    run(categories, texts, args.iterations, "Shipped config")
+    run(pad_categories(categories, args.terms), texts, max(1, args.iterations // 4), "Padded config")
+
+
+if __name__ == "__main__":
+    main()
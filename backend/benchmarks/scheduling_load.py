@@ -0,0 +1,197 @@
+"""
+Load harness for the scheduling flow, run against the offline fake calendar.
+
+Run from backend/:
+    python benchmarks/scheduling_load.py [--conversations 2000] [--concurrency 200]
+
+Drives many simulated callers through start_scheduling_flow and
+continue_scheduling_flow at once (offer -> yes -> pick a time -> contact
+details -> confirm), then waits for the queued bookings to finish. Reports
+latency per flow stage, throughput, how each conversation ended, and
+checks that no agent was booked twice for the same slot.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--horizon-days", type=int, default=28)
+    parser.add_argument("--busy-fraction", type=float, default=0.3, help="share of agent slots already booked")
+    parser.add_argument("--latency-ms", type=float, default=120, help="simulated calendar API latency")
+    parser.add_argument("--jitter-ms", type=float, default=40)
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a caller's turns")
+    parser.add_argument("--booking-workers", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def configure(args):
+    """The flow reads its settings at import time, so set them first"""
+    os.environ["CALENDAR_BACKEND"] = "fake"
+    os.environ["CALENDAR_MOCK_FALLBACK"] = "false"
+    os.environ["FAKE_CALENDAR_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_CALENDAR_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["SUPPORT_AGENT_CALENDARS"] = ",".join(f"agent{i}@example.com" for i in range(args.agents))
+    os.environ["SCHEDULING_HORIZON_DAYS"] = str(args.horizon_days)
+    os.environ.setdefault("SCHEDULING_BUSINESS_DAYS", "mon,tue,wed,thu,fri")
+    os.environ["SCHEDULING_SESSION_MAX"] = str(max(10000, args.conversations * 2))
+    os.environ["BOOKING_WORKERS"] = str(args.booking_workers)
+
+
+# Turns a simulated caller takes before giving up
+MAX_TURNS = 30
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)  # stage -> [ms]
+        self.outcomes = Counter()
+        self.booking_keys = []
+
+    def turn(self, stage, ms):
+        with self.lock:
+            self.latencies[stage].append(ms)
+
+    def finish(self, outcome, booking_key=None):
+        with self.lock:
+            self.outcomes[outcome] += 1
+            if booking_key:
+                self.booking_keys.append(booking_key)
+
+
+def converse(gc, recorder, rng, think_s):
+    """One simulated caller; returns when the flow ends"""
+    def say(text, state):
+        if think_s:
+            time.sleep(think_s)
+        stage = state.get("stage", "offering_schedule")
+        start = time.perf_counter()
+        result = gc.continue_scheduling_flow(text, state)
+        recorder.turn(stage, (time.perf_counter() - start) * 1000)
+        return result
+
+    start = time.perf_counter()
+    state = gc.start_scheduling_flow()["schedule_state"]
+    recorder.turn("start", (time.perf_counter() - start) * 1000)
+
+    result = say("yes", state)
+    contact_sent = False
+    # Callers whose pick was just held by someone else try again
+    for _ in range(MAX_TURNS):
+        booking = result.get("booking")
+        if booking:
+            # Still pending after the acknowledgement wait: the session stays
+            # open, but the conversation is over as far as the caller knows
+            recorder.finish("booked" if booking["status"] == "booked" else "booking_queued", booking["key"])
+            return
+        if result.get("done"):
+            recorder.finish(result.get("error") or result.get("stage", "ended"))
+            return
+        state = result["schedule_state"]
+        if state["stage"] == "awaiting_time":
+            offered = gc.session_store.get(state["session_id"])["available_times"]
+            choice = datetime.fromisoformat(rng.choice(offered))
+            result = say(choice.strftime("%A, %B %d at %-I:%M %p"), state)
+        elif state["stage"] == "awaiting_contact":
+            if contact_sent:
+                recorder.finish("contact_not_understood")
+                return
+            contact_sent = True
+            result = say("My name is Jane Doe, jane@example.com, 555-123-4567", state)
+        elif state["stage"] == "confirming":
+            result = say("yes", state)
+        else:
+            break
+    recorder.finish("gave_up" if not result.get("done") else "ended_on_last_turn")
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    import pytz
+    import scheduling_tool.google_calendar as gc
+
+    tz = pytz.timezone(gc.SUPPORT_TIMEZONE)
+    today = tz.localize(datetime.combine(datetime.now(tz).date(), datetime.min.time()))
+    calendar = gc.calendar_client.calendar
+    calendar.seed_busy(gc.SUPPORT_AGENT_CALENDARS, today, args.horizon_days + 1,
+                       args.busy_fraction, gc.SLOT_MINUTES, seed=args.seed)
+    seeded_events = calendar.stats()["events"]
+    calendar.calls = 0
+
+    recorder = Recorder()
+    print(f"📅 {args.conversations} conversations, {args.concurrency} at a time, "
+          f"{args.agents} agents, {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms calendar latency")
+
+    started = time.perf_counter()
+    # The flow logs every turn; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(converse, gc, recorder, random.Random(args.seed + i), args.think_ms / 1000)
+                for i in range(args.conversations)
+            ]
+            for future in futures:
+                future.result()
+        flow_elapsed = time.perf_counter() - started
+        for key in recorder.booking_keys:
+            gc.booking_queue.wait(key, timeout=60)
+    total_elapsed = time.perf_counter() - started
+
+    turns = sum(len(values) for values in recorder.latencies.values())
+    print(f"\nConversations finished in {flow_elapsed:.2f}s: "
+          f"{args.conversations / flow_elapsed:.1f} conversations/s, {turns / flow_elapsed:.1f} turns/s")
+    print(f"All bookings written after {total_elapsed:.2f}s")
+
+    print(f"\n{'stage':<20}{'turns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage in ["start", "offering_schedule", "awaiting_time", "awaiting_contact", "confirming"]:
+        values = recorder.latencies.get(stage)
+        if values:
+            print(f"{stage:<20}{len(values):>8}{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}"
+                  f"{percentile(values, 99):>10.2f}{max(values):>10.2f}")
+
+    print("\nOutcomes:")
+    for outcome, count in recorder.outcomes.most_common():
+        print(f"   {outcome:<28}{count:>8}")
+    statuses = Counter((gc.get_booking_status(key).get("status") or "unknown") for key in recorder.booking_keys)
+    print(f"   bookings written: {dict(statuses)}")
+
+    # Every agent may hold each slot once
+    booked = Counter()
+    for agent in gc.SUPPORT_AGENT_CALENDARS:
+        for event in calendar.stored(agent):
+            booked[(agent, event["start"]["dateTime"])] += 1
+    double_booked = sum(1 for count in booked.values() if count > 1)
+
+    print(f"\nCalendar API calls: {calendar.stats()['calls']} "
+          f"(events: {seeded_events} seeded, {calendar.stats()['events'] - seeded_events} booked)")
+    print(f"Availability cache: {gc.availability_cache.stats()}")
+    print(f"Slot holds: {gc.reservation_ledger.stats()}")
+    print(f"Booking queue: {gc.booking_queue.stats()}")
+    if double_booked:
+        raise SystemExit(f"❌ {double_booked} agent slots were booked more than once")
+    print("✅ No agent was booked twice for the same slot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Regression check and micro-benchmark for spoken-time slot matching.
+
+Run from backend/:
+    python benchmarks/time_matcher.py [--iterations 2000]
+
+Every case in time_phrase_corpus.json is checked against the phrase index
+(exits non-zero on a mismatch), then the index is timed against the
+previous per-utterance strftime matcher, which is kept below for comparison.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduling_tool.time_phrases import build_time_phrase_index, match_time_phrase
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "time_phrase_corpus.json")
+
+
+def legacy_match(user_text, available_times):
+    """The previous _match_time_from_speech, minus its logging"""
+    user_lower = user_text.lower()
+    for time_str in available_times:
+        dt = datetime.fromisoformat(time_str)
+        formats_to_check = [
+            dt.strftime("%A").lower(), dt.strftime("%A, %B %d").lower(), dt.strftime("%B %d").lower(),
+            dt.strftime("%B %dth").lower(), dt.strftime("%B %dst").lower(), dt.strftime("%B %dnd").lower(),
+            dt.strftime("%B %drd").lower(), dt.strftime("%I %p").lower().replace(" ", ""),
+            dt.strftime("%I:%M %p").lower().replace(" ", ""), dt.strftime("%A at %I %p").lower(),
+            dt.strftime("%A at %I:%M %p").lower(), dt.strftime("%A, %B %d at %I %p").lower(),
+            dt.strftime("%A, %B %d at %I:%M %p").lower(), dt.strftime("%B %d at %I %p").lower(),
+            dt.strftime("%B %d at %I:%M %p").lower(), dt.strftime("%I %p on %A").lower(),
+            dt.strftime("%I:%M %p on %A").lower(), dt.strftime("%A, %B %dth at %I %p").lower(),
+            dt.strftime("%A, %B %dth at %I:%M %p").lower(), dt.strftime("%B %dth at %I %p").lower(),
+            dt.strftime("%B %dth at %I:%M %p").lower(),
+        ]
+        for fmt in formats_to_check:
+            if fmt in user_lower:
+                return time_str
+        day_time_formats = [
+            f"{dt.strftime('%A').lower()} {dt.strftime('%I %p').lower().replace(' ', '')}",
+            f"{dt.strftime('%A').lower()} {dt.strftime('%I:%M %p').lower().replace(' ', '')}",
+            f"{dt.strftime('%A').lower()} at {dt.strftime('%I %p').lower()}",
+            f"{dt.strftime('%A').lower()} at {dt.strftime('%I:%M %p').lower()}",
+        ]
+        for fmt in day_time_formats:
+            if fmt in user_lower:
+                return time_str
+        time_only_patterns = [
+            dt.strftime("%I %p").lower().replace(" ", ""), dt.strftime("%I:%M %p").lower().replace(" ", ""),
+            dt.strftime("%I %p").lower(), dt.strftime("%I:%M %p").lower(),
+        ]
+        for time_pattern in time_only_patterns:
+            if time_pattern in user_lower and len(user_lower.split()) <= 3:
+                return time_str
+    day_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+    mentioned_days = [day for day in day_names if day in user_lower]
+    if mentioned_days:
+        for time_str in available_times:
+            dt = datetime.fromisoformat(time_str)
+            if dt.strftime("%A").lower() in mentioned_days:
+                for pattern in [r'\b\d{1,2}\s*(?:am|pm)\b', r'\b\d{1,2}:\d{2}\s*(?:am|pm)\b']:
+                    if re.search(pattern, user_lower):
+                        return time_str
+    for time_str in available_times:
+        dt = datetime.fromisoformat(time_str)
+        day_name = dt.strftime("%A").lower()
+        time_mentioned = (dt.strftime("%I %p").lower() in user_lower or
+                          dt.strftime("%I %p").lower().replace(" ", "") in user_lower or
+                          f"{dt.strftime('%I')} am" in user_lower or f"{dt.strftime('%I')} pm" in user_lower)
+        if day_name in user_lower and time_mentioned:
+            return time_str
+    return None
+
+
+def timed(fn, utterances, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for utterance in utterances:
+            fn(utterance)
+    return (time.perf_counter() - start) / (iterations * len(utterances)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    slots = corpus["slots"]
+    today = date.fromisoformat(corpus["today"])
+    index = build_time_phrase_index(slots, today=today)
+
+    failures = 0
+    legacy_agrees = 0
+    for case in corpus["cases"]:
+        expected = slots[case["expected"]] if case["expected"] is not None else None
+        got = match_time_phrase(case["utterance"], slots, index)
+        legacy_agrees += legacy_match(case["utterance"], slots) == expected
+        if got != expected:
+            failures += 1
+            print(f"❌ {case['utterance']!r}: expected {expected}, got {got}")
+    if failures:
+        raise SystemExit(f"{failures} of {len(corpus['cases'])} corpus cases failed")
+    print(f"✅ All {len(corpus['cases'])} corpus cases pass "
+          f"(the previous matcher got {legacy_agrees} right)")
+
+    utterances = [case["utterance"] for case in corpus["cases"]]
+    legacy_us = timed(lambda u: legacy_match(u, slots), utterances, args.iterations)
+    index_us = timed(lambda u: match_time_phrase(u, slots, index), utterances, args.iterations)
+    build_us = timed(lambda _: build_time_phrase_index(slots, today=today), [None], args.iterations)
+    print(f"\n{len(slots)} offered slots, {len(utterances)} utterances")
+    print(f"   previous strftime matcher : {legacy_us:8.2f} µs/utterance")
+    print(f"   phrase index lookup       : {index_us:8.2f} µs/utterance")
+    print(f"   speedup                   : {legacy_us / index_us:8.2f}x")
+    print(f"   index build (once/offer)  : {build_us:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlite_connections import ThreadConnections
+
+# ---------- Moderation Result Cache ----------
+
+# The SQLite tier drops expired rows and trims to size every this many writes
+PRUNE_EVERY_WRITES = 64
+
+
+def normalize_text(text: str) -> str:
+    """Key normalization: Unicode NFKC, case-folded, whitespace collapsed"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class ModerationCache:
+    """
+    Caches moderation results by normalized text with a TTL.
+
+    The memory tier is an LRU bounded by `max_entries`. The optional SQLite
+    tier (`db_path`) survives restarts and is shared by all uvicorn workers
+    on the host; it holds up to `db_max_entries` rows. Results carrying an
+    `error` key are never stored, so a failed API call is retried next time
+    instead of its fail-open answer being remembered.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 10000,
+                 db_path: Optional[str] = None, db_max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.db_max_entries = db_max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()  # key -> (result, expires_at)
+        self._lock = threading.Lock()
+        self._db = ThreadConnections(db_path).get
+        self._db_writes = 0
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.skipped_errors = 0
+        if db_path:
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS moderation_cache ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db().execute(
+                "CREATE INDEX IF NOT EXISTS moderation_cache_expires ON moderation_cache (expires_at)"
+            )
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, result: Dict, expires_at: float):
+        with self._lock:
+            self._entries[key] = (result, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, text: str) -> Optional[Dict]:
+        key = self.key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+        if self.db_path:
+            try:
+                row = self._db().execute(
+                    "SELECT result, expires_at FROM moderation_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row:
+                    result = json.loads(row[0])
+                    self._remember(key, result, row[1])
+                    with self._lock:
+                        self.db_hits += 1
+                    return result
+            except Exception as e:
+                print(f"⚠️ Moderation cache read failed: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, result: Dict):
+        if result.get("error"):
+            with self._lock:
+                self.skipped_errors += 1
+            return
+        key = self.key(text)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, result, expires_at)
+        if self.db_path:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO moderation_cache (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), expires_at)
+                )
+                with self._lock:
+                    self._db_writes += 1
+                    prune = self._db_writes % PRUNE_EVERY_WRITES == 0
+                if prune:
+                    self._prune_db(db)
+            except Exception as e:
+                print(f"⚠️ Moderation cache write failed: {e}")
+
+    def _prune_db(self, db: sqlite3.Connection):
+        db.execute("DELETE FROM moderation_cache WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM moderation_cache WHERE key IN ("
+            "SELECT key FROM moderation_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.db_max_entries,)
+        )
+
+    def invalidate(self) -> int:
+        """Drop every cached result (both tiers); returns the in-memory count"""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        if self.db_path:
+            try:
+                self._db().execute("DELETE FROM moderation_cache")
+            except Exception as e:
+                print(f"⚠️ Moderation cache clear failed: {e}")
+        return dropped
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+                "skipped_errors": self.skipped_errors,
+                "db_enabled": bool(self.db_path)
+            }
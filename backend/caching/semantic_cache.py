@@ -0,0 +1,95 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# ---------- Similarity-Keyed Answer Cache ----------
+
+class SemanticCache:
+    """
+    Caches answers keyed by question embedding. A lookup returns the stored
+    answer of the most similar cached question if its cosine similarity is
+    at least `threshold` and the entry has not expired.
+
+    Vectors live in one preallocated matrix so a lookup is a single
+    matrix-vector product; free rows are zero and can never match.
+    Entries are evicted least-recently-used once `max_entries` is reached.
+    """
+
+    def __init__(self, dim: int, threshold: float = 0.92, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._matrix = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries: "OrderedDict[int, Tuple[Dict, float]]" = OrderedDict()  # row -> (value, expires_at)
+        self._free_rows = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _drop(self, row: int):
+        del self._entries[row]
+        self._matrix[row] = 0.0
+        self._free_rows.append(row)
+
+    def lookup(self, vector) -> Optional[Tuple[Dict, float]]:
+        """Returns `(value, similarity)` for the best fresh match, or None"""
+        v = self._normalize(vector)
+        with self._lock:
+            if self._entries:
+                scores = self._matrix @ v
+                row = int(np.argmax(scores))
+                similarity = float(scores[row])
+                if similarity >= self.threshold and row in self._entries:
+                    value, expires_at = self._entries[row]
+                    if expires_at > time.time():
+                        self._entries.move_to_end(row)
+                        self.hits += 1
+                        return value, similarity
+                    self._drop(row)
+            self.misses += 1
+            return None
+
+    def store(self, vector, value: Dict):
+        """Caches `value` for the question embedded as `vector`"""
+        v = self._normalize(vector)
+        with self._lock:
+            if not self._free_rows:
+                oldest, _ = next(iter(self._entries.items()))
+                self._drop(oldest)
+            row = self._free_rows.pop()
+            self._matrix[row] = v
+            self._entries[row] = (value, time.time() + self.ttl_seconds)
+
+    def invalidate(self):
+        """Drops every entry, e.g. after the knowledge base is re-ingested"""
+        with self._lock:
+            self._matrix[:] = 0.0
+            self._entries.clear()
+            self._free_rows = list(range(self.max_entries - 1, -1, -1))
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "miss_ratio": round(self.misses / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds
+            }
@@ -1,57 +1,109 @@
-import re
+import os
 import openai
 from typing import Dict, List
-from functools import lru_cache
+from tracing import span
+from caching.moderation_cache import ModerationCache
+from llm_moderation.pattern_matcher import PatternMatcher
+from llm_moderation.moderation_batcher import ModerationBatcher
+from llm_moderation.local_classifier import LocalClassifier
 
 # ---------- OpenAI Moderation ----------
 
-@lru_cache(maxsize=1000)
+# Successful moderation results are cached by normalized text; set
+# MODERATION_CACHE_DB to share them across workers and restarts
+moderation_cache = ModerationCache(
+    ttl_seconds=float(os.getenv("MODERATION_CACHE_TTL_SECONDS", "86400")),
+    max_entries=int(os.getenv("MODERATION_CACHE_MAX_ENTRIES", "10000")),
+    db_path=os.getenv("MODERATION_CACHE_DB") or None,
+    db_max_entries=int(os.getenv("MODERATION_CACHE_DB_MAX_ENTRIES", "100000"))
+)
+
+def _moderate_many(texts: List[str]) -> List[Dict]:
+    """One Moderation API call for a list of inputs"""
+    response = openai.moderations.create(input=texts)
+    return [result.model_dump() for result in response.results]
+
+# Concurrent requests' texts are sent together: callers wait up to
+# MODERATION_BATCH_WINDOW_MS for others to join (0 sends each text alone)
+MODERATION_BATCH_WINDOW_MS = float(os.getenv("MODERATION_BATCH_WINDOW_MS", "5"))
+moderation_batcher = ModerationBatcher(
+    _moderate_many,
+    window_ms=MODERATION_BATCH_WINDOW_MS,
+    max_batch=int(os.getenv("MODERATION_BATCH_MAX", "32")),
+    max_concurrency=int(os.getenv("MODERATION_BATCH_CONCURRENCY", "4"))
+) if MODERATION_BATCH_WINDOW_MS > 0 else None
+
 def check_moderation(text: str) -> Dict:
     """
     Uses OpenAI Moderation API to check for content policy violations.
-    Cached to avoid repeated API calls for similar content.
+    Cached to avoid repeated API calls for similar content; a failed call
+    fails open and is not cached, so the next request tries again.
     """
+    cached = moderation_cache.get(text)
+    if cached is not None:
+        return cached
     try:
-        response = openai.Moderation.create(input=text)
-        return response["results"][0]
+        if moderation_batcher is not None:
+            result = moderation_batcher.moderate(text)
+        else:
+            result = _moderate_many([text])[0]
     except Exception as e:
-        return {"flagged": False, "error": str(e)}
+        result = {"flagged": False, "error": str(e)}
+    moderation_cache.put(text, result)  # skips error results
+    return result
 
 
-# ---------- Custom Regex-Based Filters ----------
+# ---------- Custom Pattern Filters ----------
 
-SENSITIVE_PATTERNS = {
-    "personal_data": r"\b(SSN|social security number|home address|date of birth)\b",
-    "legal_advice": r"\b(lawsuit|attorney|lawyer|legal advice|court|settlement|file a claim|sue)\b",
-    "financial_advice": r"\b(invest|stock|retirement|buy|sell|portfolio|wealth management|tax advice|IRA|Roth IRA)\b"
-}
+# Sensitive terms per category; edit the JSON (or point GUARDRAIL_PATTERNS_PATH
+# at another file) to change them. All terms are matched in a single pass.
+GUARDRAIL_PATTERNS_PATH = os.getenv(
+    "GUARDRAIL_PATTERNS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "guardrail_patterns.json")
+)
+
+sensitive_matcher = PatternMatcher.from_file(GUARDRAIL_PATTERNS_PATH)
 
-@lru_cache(maxsize=1000)
 def check_custom_guardrails(text: str) -> List[str]:
     """
     Returns a list of violation types if any patterns are matched.
-    Cached to avoid repeated regex processing.
     """
-    violations = []
-    for label, pattern in SENSITIVE_PATTERNS.items():
-        if re.search(pattern, text, re.IGNORECASE):
-            violations.append(label)
-    return violations
+    return sensitive_matcher.match(text)
+
+
+# ---------- Local First-Pass Classifier ----------
+
+# Clears obviously benign support questions without a remote moderation call;
+# retrain with data-ingestion/train_moderation_classifier.py
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+LOCAL_CLASSIFIER_PATH = os.getenv(
+    "LOCAL_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_classifier_model.json")
+)
+LOCAL_CLASSIFIER_THRESHOLD = os.getenv("LOCAL_CLASSIFIER_THRESHOLD")  # default: the model's own
+
+local_classifier = None
+if LOCAL_CLASSIFIER_ENABLED:
+    try:
+        local_classifier = LocalClassifier.from_file(
+            LOCAL_CLASSIFIER_PATH,
+            float(LOCAL_CLASSIFIER_THRESHOLD) if LOCAL_CLASSIFIER_THRESHOLD else None
+        )
+    except Exception as e:
+        print(f"⚠️ Local moderation classifier unavailable, using remote moderation only: {e}")
 
 
 # ---------- Combined Guardrail Check ----------
 
-@lru_cache(maxsize=1000)
 def check_guardrails(text: str) -> Dict:
     """
-    Runs both OpenAI moderation and custom guardrails.
+    Runs custom guardrails, the local classifier and OpenAI moderation.
     Returns a dict with:
         - 'blocked': bool
         - 'reason': str
-        - 'moderation': full OpenAI result (optional)
+        - 'moderation': full OpenAI result (optional; `skipped_remote` and
+          `local_score` when the local classifier cleared the text)
         - 'violations': list of custom flags
-    
-    Cached to avoid repeated processing for similar inputs.
     """
     result = {
         "blocked": False,
@@ -61,15 +113,25 @@ def check_guardrails(text: str) -> Dict:
     }
 
     # 1. Custom pattern check first (faster than API call)
-    violations = check_custom_guardrails(text)
+    with span("guardrails.custom"):
+        violations = check_custom_guardrails(text)
     if violations:
         result["blocked"] = True
         result["reason"] = "Custom Guardrail Violation"
         result["violations"] = violations
         return result
 
-    # 2. OpenAI Moderation (only if custom check passes)
-    moderation = check_moderation(text)
+    # 2. Local classifier: confidently benign text skips the API call
+    if local_classifier is not None:
+        with span("guardrails.local"):
+            cleared, score = local_classifier.clears(text)
+        if cleared:
+            result["moderation"] = {"flagged": False, "skipped_remote": True, "local_score": round(score, 4)}
+            return result
+
+    # 3. OpenAI Moderation (only if the checks above are inconclusive)
+    with span("guardrails.moderation"):
+        moderation = check_moderation(text)
     result["moderation"] = moderation
     if moderation.get("flagged", False):
         result["blocked"] = True
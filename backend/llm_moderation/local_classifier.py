@@ -0,0 +1,89 @@
+import re
+import json
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# ---------- Local First-Pass Moderation Classifier ----------
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def features(tokens: List[str]) -> List[str]:
+    """Unigrams plus bigrams (joined with a space)"""
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class LocalClassifier:
+    """
+    Naive Bayes benign/risky scorer over word unigrams and bigrams, trained
+    offline by `data-ingestion/train_moderation_classifier.py` and loaded
+    from its JSON model file.
+
+    `clears` only returns True when the text is confidently benign: the
+    benign probability is at least `threshold`, no risk-lexicon word or
+    two-word phrase appears, every word is known to the model (by default;
+    see `max_unknown_ratio`) and the text is short.
+    Anything else is left for the remote moderation API.
+    """
+
+    def __init__(self, model: Dict, threshold: Optional[float] = None):
+        self.log_prior = model["log_prior"]
+        self.log_likelihood = model["log_likelihood"]
+        self.vocabulary = set(model["vocabulary"])
+        self.risk_terms = set(model["risk_terms"])
+        self.threshold = threshold if threshold is not None else model["threshold"]
+        self.max_unknown_ratio = model["max_unknown_ratio"]
+        self.max_tokens = model["max_tokens"]
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.cleared = 0
+
+    @classmethod
+    def from_file(cls, path: str, threshold: Optional[float] = None) -> "LocalClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), threshold)
+
+    def benign_probability(self, tokens: List[str]) -> float:
+        benign, risky = self.log_prior
+        for feature in features(tokens):
+            weights = self.log_likelihood.get(feature)
+            if weights:
+                benign += weights[0]
+                risky += weights[1]
+        # P(benign) = 1 / (1 + e^(risky - benign)), clamped against overflow
+        return 1.0 / (1.0 + math.exp(max(-50.0, min(50.0, risky - benign))))
+
+    def score(self, text: str) -> Tuple[bool, float]:
+        """Returns `(confidently_benign, benign_probability)`"""
+        tokens = tokenize(text)
+        if not tokens or len(tokens) > self.max_tokens:
+            return False, 0.0
+        if any(feature in self.risk_terms for feature in features(tokens)):
+            return False, 0.0
+        unknown = sum(1 for token in tokens if token not in self.vocabulary)
+        probability = self.benign_probability(tokens)
+        cleared = probability >= self.threshold and unknown / len(tokens) <= self.max_unknown_ratio
+        return cleared, probability
+
+    def clears(self, text: str) -> Tuple[bool, float]:
+        """`score`, counted towards the reported skip rate"""
+        cleared, probability = self.score(text)
+        with self._lock:
+            self.checked += 1
+            if cleared:
+                self.cleared += 1
+        return cleared, probability
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "checked": self.checked,
+                "cleared_locally": self.cleared,
+                "skip_rate": round(self.cleared / self.checked, 4) if self.checked else 0.0
+            }
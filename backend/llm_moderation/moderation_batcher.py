@@ -0,0 +1,91 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+# ---------- Micro-Batched Moderation ----------
+
+class ModerationBatcher:
+    """
+    Coalesces moderation requests from concurrent callers into batched API
+    calls. The first text to arrive opens a batch; texts arriving within
+    `window_ms` (up to `max_batch` of them) join it, and the whole batch is
+    sent as one call to `moderate_many`. Each caller blocks only on its own
+    result. Identical texts in a batch are sent once.
+
+    `moderate_many` takes a list of texts and returns one result per text in
+    the same order; if it raises, every caller in that batch gets the error.
+    """
+
+    def __init__(self, moderate_many: Callable[[List[str]], List[Dict]], window_ms: float = 5,
+                 max_batch: int = 32, max_concurrency: int = 4):
+        self.moderate_many = moderate_many
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="moderation-batch")
+        self._collector = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.api_inputs = 0
+        self.largest_batch = 0
+
+    def _ensure_started(self):
+        if self._collector is None:
+            with self._lock:
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name="moderation-batcher", daemon=True)
+                    self._collector.start()
+
+    def moderate(self, text: str) -> Dict:
+        """Moderate one text as part of the next batch (blocks until done)"""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Sent from the pool so the next batch can fill while this one is in flight
+            self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        with self._lock:
+            self.batches += 1
+            self.texts += len(batch)
+            self.api_inputs += len(texts)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = self.moderate_many(texts)
+            if len(results) != len(texts):
+                raise RuntimeError(f"Expected {len(texts)} moderation results, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        by_text = dict(zip(texts, results))
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "window_ms": round(self.window * 1000, 2),
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "texts": self.texts,
+                "api_inputs": self.api_inputs,
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch
+            }
@@ -0,0 +1,102 @@
+import re
+import json
+from typing import Dict, Iterable, List
+
+# ---------- Single-Pass Multi-Pattern Matcher ----------
+
+def _is_word_char(char: str) -> bool:
+    """What regex `\\w` matches"""
+    return char.isalnum() or char == "_"
+
+
+def _word_boundary_prefixes(term: str, terms: Iterable[str]) -> List[str]:
+    """Terms that also match wherever `term` matches (same start, shorter)"""
+    prefixes = []
+    for other in terms:
+        if other == term:
+            prefixes.append(other)
+        elif term.startswith(other) and not _is_word_char(term[len(other)]):
+            prefixes.append(other)
+    return prefixes
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Compiles terms into one regex alternation shaped like a trie, so the
+    engine branches on the next character instead of trying every term.
+    Longer continuations come first, which makes each match the longest
+    term starting at that position.
+    """
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class PatternMatcher:
+    """
+    Matches a {category: [terms]} set against text in one pass.
+
+    All terms are compiled into a single trie-shaped regex that is tried once
+    at each position not preceded by a word character, so cost grows with
+    the text length rather than with the number of terms. Matching is
+    case-insensitive on whole terms: a term must not be preceded or followed
+    by a word character. Unlike `\\b`, that also works for terms that start
+    or end with punctuation (`c++`, `$100`). `match` returns every category
+    with at least one hit in the order the config lists them.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        term_categories: Dict[str, set] = {}
+        for label, terms in categories.items():
+            for term in terms:
+                term = term.strip().lower()
+                if term:
+                    term_categories.setdefault(term, set()).add(label)
+
+        # A match reports the longest term at its position; shorter terms
+        # that end on a word boundary inside it matched there too
+        self._term_categories = {}
+        for term in term_categories:
+            labels = set()
+            for prefix in _word_boundary_prefixes(term, term_categories):
+                labels |= term_categories[prefix]
+            self._term_categories[term] = labels
+
+        self.term_count = len(self._term_categories)
+        if self._term_categories:
+            # Zero-width lookahead so overlapping terms ("social security
+            # number" / "security") are each seen at their own start
+            self._regex = re.compile(r"(?<!\w)(?=(" + _trie_pattern(self._term_categories) + r")(?!\w))", re.IGNORECASE)
+        else:
+            self._regex = None
+
+    @classmethod
+    def from_file(cls, path: str) -> "PatternMatcher":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, text: str) -> List[str]:
+        if self._regex is None:
+            return []
+        found = set()
+        for m in self._regex.finditer(text):
+            found |= self._term_categories.get(m.group(1).lower(), set())
+            if len(found) == len(self.categories):
+                break
+        return [label for label in self.categories if label in found]
@@ -4,24 +4,53 @@ import time
 import io
 import base64
 import json
+import re
+import asyncio
+from urllib.parse import quote
 
 # Third-party imports
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, Request, UploadFile, File, BackgroundTasks, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pinecone import Pinecone
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+# Local modules read their settings at import time
+load_dotenv()
 
 # Local imports
-from llm_moderation.guardrails import check_guardrails
-from scheduling_tool.google_calendar import ScheduleRequest, schedule_support_event, get_available_times
+from llm_moderation.guardrails import check_guardrails, moderation_cache, moderation_batcher, local_classifier
+from scheduling_tool.google_calendar import ScheduleRequest, schedule_support_event, get_available_times, availability_cache, reservation_ledger, booking_queue, get_booking_status
+from upstreams import run_blocking, upstream_slot, shutdown_upstreams
+from tracing import Trace, start_trace, resume_trace, finish_trace, span, slow_traces
+from caching.semantic_cache import SemanticCache
+from voice.sentences import SentenceSplitter, split_sentences
+from voice.tts_cache import TTSCache
+from retrieval.local_index import LocalVectorIndex
+from retrieval.context_packer import pack_context, count_tokens
 
-load_dotenv()
+# Retrieval backend: "pinecone" (remote) or "local" (in-process index built
+# from data-ingestion/aven_data, see data-ingestion/embed_chunks.py)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "pinecone").lower()
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data-ingestion", "aven_data")
+LOCAL_INDEX_CHUNKS_PATH = os.getenv("LOCAL_INDEX_CHUNKS_PATH", os.path.join(_DATA_DIR, "aven_chunked.json"))
+LOCAL_INDEX_EMBEDDINGS_PATH = os.getenv("LOCAL_INDEX_EMBEDDINGS_PATH", os.path.join(_DATA_DIR, "aven_embeddings.npz"))
+
+local_index = None
+if RETRIEVAL_BACKEND == "local":
+    try:
+        local_index = LocalVectorIndex.from_files(LOCAL_INDEX_CHUNKS_PATH, LOCAL_INDEX_EMBEDDINGS_PATH)
+        print(f"✅ Loaded local index with {len(local_index)} chunks")
+    except Exception as e:
+        print(f"⚠️ Local index unavailable, falling back to Pinecone: {e}")
+        RETRIEVAL_BACKEND = "pinecone"
 
 # Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+index = None
+if RETRIEVAL_BACKEND == "pinecone":
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
 
 # Initialize OpenAI client
 client = OpenAI(
@@ -30,20 +59,90 @@ client = OpenAI(
     timeout=30.0
 )
 
+# Async OpenAI client used by the request handlers so LLM, STT and TTS
+# calls never block the event loop
+async_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=3,
+    timeout=30.0
+)
+
 # Configuration constants
-SIMILARITY_THRESHOLD = 0.3  # Lower threshold to include more relevant matches
 TOP_K_RESULTS = 10  # Reduced from 5 for faster processing
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # Max context tokens sent to the LLM
 OPENAI_MODEL = "gpt-4o-mini"  # Faster model for better performance
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+
+# Semantic answer cache (paraphrased questions reuse a cached answer)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
+
+answer_cache = SemanticCache(
+    dim=EMBEDDING_DIM,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES
+)
+
+# Start retrieval while the guardrails check is still running and discard it
+# if the question is blocked; saves one round trip on every allowed question
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
 
 # Error messages
 EMPTY_QUESTION_ERROR = "I couldn't understand your question. Please try asking again."
 PINECONE_ERROR = "Sorry, I'm having trouble accessing the information right now. Please try again."
 NO_MATCHES_ERROR = "I'm not sure about that. Please reach out to our support team for more help.\n\nWould you like me to help you schedule a call with our support team?"
 SCHEDULING_ERROR = "Sorry, there was an error with scheduling. Let me help you another way."
+VOICE_RAG_ERROR = "Sorry, I'm having trouble processing your request right now. Please try again."
+
+# Synthesized audio cache (canned voice prompts are pre-warmed at startup)
+VOICE_NAME = "alloy"
+VOICE_SPEED = 1.1
+AUDIO_CHUNK_BYTES = 16 * 1024
+tts_cache = TTSCache(
+    max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    disk_dir=os.getenv("TTS_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+)
+
+async def guardrails_check_async(text: str) -> dict:
+    """Run the guardrails check on the moderation thread pool"""
+    with span("guardrails"):
+        return await run_blocking("moderation", check_guardrails, text)
 
-def guardrails_check(text: str) -> dict:
-    """Check if text violates content policy guardrails"""
-    return check_guardrails(text)
+def _discard_speculation(task):
+    """Drop a speculative retrieval whose result will not be used"""
+    if task is None:
+        return
+    task.cancel()
+    # Retrieve the outcome so a failure that beat the cancel is not logged as unhandled
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def _moderate_and_retrieve(question: str, schedule_state: dict = None):
+    """
+    Run the guardrails check, with RAG retrieval (embedding, answer cache,
+    search) started alongside it when SPECULATIVE_RETRIEVAL is on.
+
+    Returns `(check, retrieval)`: `retrieval` is a `_rag_retrieve` result,
+    or None when nothing was speculated. If the question is blocked the
+    retrieval is cancelled and never used.
+    """
+    task = None
+    if SPECULATIVE_RETRIEVAL and not (schedule_state and schedule_state.get("active", False)):
+        task = asyncio.create_task(_rag_retrieve(question))
+    try:
+        check = await guardrails_check_async(question)
+    except BaseException:
+        _discard_speculation(task)
+        raise
+    if check["blocked"] or task is None:
+        _discard_speculation(task)
+        return check, None
+    return check, await task
 
 
 
@@ -61,7 +160,8 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Transcript", "X-Answer", "X-Audio-Format", "X-Schedule-State", "X-Sources", "X-Booking"]
 )
 
 @app.on_event("startup")
@@ -70,13 +170,17 @@ async def startup_event():
     print("🚀 Warming up connections...")
     
     # Warm up Pinecone connection
-    try:
-        test_query = {"inputs": {"text": "test"}, "top_k": 1}
-        index.search(namespace="__default__", query=test_query)
-        print("✅ Pinecone connection warmed up")
-    except Exception as e:
-        print(f"⚠️ Pinecone warmup failed: {e}")
+    if index is not None:
+        try:
+            test_query = {"inputs": {"text": "test"}, "top_k": 1}
+            index.search(namespace="__default__", query=test_query)
+            print("✅ Pinecone connection warmed up")
+        except Exception as e:
+            print(f"⚠️ Pinecone warmup failed: {e}")
     
+    # Load the tokenizer used by the context packer
+    count_tokens("warmup")
+
     # Warm up OpenAI connection
     try:
         client.chat.completions.create(
@@ -88,28 +192,171 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️ OpenAI warmup failed: {e}")
     
+    # Pre-synthesize canned voice prompts in the background
+    app.state.tts_prewarm = asyncio.create_task(_prewarm_tts_cache())
+
     print("🎯 Server ready!")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("🛑 Shutting down server...")
+    shutdown_upstreams()
     print("✅ Server shutdown complete")
 
 
 
-def run_rag_pipeline(question: str) -> dict:
-    """Run the RAG pipeline to answer questions
-    
-    Args:
-        question: The user's question
-        
-    Returns:
-        dict: Response containing answer, sources, and metadata
+# Scheduling trigger phrases
+SCHEDULING_KEYWORDS = [
+    "schedule", "scheduling", "appointment", "call", "representative",
+    "speak to someone", "talk to someone", "human", "agent", "support call",
+    "help me", "assist me", "contact", "reach out"
+]
+UNCERTAINTY_INDICATORS = [
+    "i'm not sure about that",
+    "i don't have enough information",
+    "please contact support",
+    "speak to a representative",
+    "call our support team"
+]
+AFFIRMATIVE_RESPONSES = ["yes", "yeah", "sure", "ok", "okay", "yep", "absolutely", "definitely"]
+SCHEDULING_OFFER_INDICATORS = [
+    "would you like me to help you schedule",
+    "schedule a call",
+    "help you schedule"
+]
+
+
+def _compile_intents(groups: dict) -> re.Pattern:
     """
-    question = question.strip()
-    
-    # Validate input
+    Compile phrase lists into one matcher with a named group per intent.
+    Phrases match as substrings (like `phrase in text`), and the lookahead
+    lets every start position report a hit, so overlapping phrases from
+    different intents are all found in a single scan.
+    """
+    alternatives = []
+    for name, phrases in groups.items():
+        ordered = sorted(phrases, key=len, reverse=True)
+        alternatives.append(f"(?P<{name}>{'|'.join(re.escape(p) for p in ordered)})")
+    return re.compile(f"(?=(?:{'|'.join(alternatives)}))")
+
+
+def _match_intents(matcher: re.Pattern, text: str) -> set:
+    """Return the names of all intents with a phrase occurring in `text`"""
+    found = set()
+    for m in matcher.finditer(text.lower()):
+        found.add(m.lastgroup)
+    return found
+
+
+# Question-side intents are checked before retrieval, answer-side ones after the LLM
+QUESTION_INTENTS = _compile_intents({
+    "scheduling": SCHEDULING_KEYWORDS,
+    "affirmative": AFFIRMATIVE_RESPONSES
+})
+ANSWER_INTENTS = _compile_intents({
+    "uncertainty": UNCERTAINTY_INDICATORS,
+    "scheduling_offer": SCHEDULING_OFFER_INDICATORS
+})
+
+SCHEDULE_TRIGGER_ANSWER = "Would you like me to help you schedule a call with our support team? (Reply with Yes or No)"
+LLM_ERROR_ANSWER = "I'm having trouble processing your request right now. Please try again in a moment."
+
+
+def build_prompt(context: str, question: str) -> str:
+    """Build the prompt for the LLM with consistent formatting"""
+    return (
+        "You are a helpful assistant for Aven financial services. Answer questions about Aven products, services, policies, and procedures using the provided information. "
+        "If someone mentions 'Avon' or similar misspellings, assume they mean 'Aven' and provide helpful information about Aven services. "
+        "Answer questions about loan offers, payment estimates, application processes, eligibility, and other financial services topics using the available information. "
+        "If the question is completely unrelated to financial services (like weather, jokes, etc.), politely redirect to Aven topics. "
+        "Be direct and to the point. Use bullet points when listing requirements. "
+        "Keep responses under 100 words. Be brief and actionable.\n\n"
+        "If someone asks to schedule a call or speak to a representative, offer to help schedule.\n\n"
+        f"Information:\n{context}\n\n"
+        f"Question: {question}\n\n"
+        "Answer:"
+    )
+
+
+def _llm_request(prompt: str) -> dict:
+    """Keyword arguments for the chat completion call"""
+    return dict(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,  # Reduced from 0.2 for faster, more consistent responses
+        max_tokens=150,   # Reduced from 200 for more concise responses
+        top_p=0.9,        # Add top_p for faster sampling
+        timeout=10,       # Reduced timeout for faster responses
+    )
+
+
+def _search_pinecone(question: str) -> list:
+    """Search Pinecone for the top matching chunks"""
+    res = index.search(
+        namespace="__default__",
+        query={"inputs": {"text": question}, "top_k": TOP_K_RESULTS},
+    )
+    return res.result["hits"]
+
+
+async def _search(question: str, vector=None) -> list:
+    """Retrieve matching chunks from the configured backend
+
+    The local index reuses the question embedding computed for the answer
+    cache when there is one.
+    """
+    with span("retrieval", backend=RETRIEVAL_BACKEND):
+        if local_index is not None:
+            if vector is None:
+                vector = await _embed_question(question)
+                if vector is None:
+                    raise RuntimeError("Failed to embed question")
+            return local_index.search(vector, TOP_K_RESULTS)
+        return await run_blocking("pinecone", _search_pinecone, question)
+
+
+def _prepare_prompt(question: str, matches: list):
+    """Pack de-duplicated, score-ordered hits into the token budget and build the prompt"""
+    with span("context_packing"):
+        context, context_stats = pack_context(matches, CONTEXT_TOKEN_BUDGET)
+        prompt = build_prompt(context, question)
+        context_stats["prompt_tokens"] = count_tokens(prompt)
+    return prompt, context_stats
+
+
+def _should_trigger_schedule(question: str, answer: str) -> bool:
+    """Decide from the question and the generated answer whether to offer scheduling"""
+    question_intents = _match_intents(QUESTION_INTENTS, question)
+    answer_intents = _match_intents(ANSWER_INTENTS, answer)
+
+    # Scheduling intent in the question, an uncertain LLM response, or a
+    # "yes" to a response that offers scheduling
+    return (
+        "scheduling" in question_intents
+        or "uncertainty" in answer_intents
+        or ("affirmative" in question_intents and "scheduling_offer" in answer_intents)
+    )
+
+
+def _preclassify_schedule(question: str):
+    """
+    Short-circuit questions that ask for a human before paying for retrieval
+    and the LLM (the generated answer would be replaced anyway).
+    """
+    if "scheduling" not in _match_intents(QUESTION_INTENTS, question):
+        return None
+    return {
+        "answer": SCHEDULE_TRIGGER_ANSWER,
+        "sources": [],
+        "latency_ms": 0,
+        "details": {"intent": "scheduling"},
+        "trigger_schedule": True
+    }
+
+
+def _validate_question(question: str):
+    """Return an error response for unusable questions, otherwise None"""
     if not question or len(question.strip()) < 3:
         return {
             "answer": EMPTY_QUESTION_ERROR,
@@ -117,242 +364,521 @@ def run_rag_pipeline(question: str) -> dict:
             "latency_ms": 0,
             "error": "Empty or too short question"
         }
-    
+    return None
 
-    
-    t0 = time.time()
-    
-    # Search Pinecone
+
+def _search_error_response(error: Exception, t0: float) -> dict:
+    print(f"{RETRIEVAL_BACKEND.capitalize()} search error: {error}")
+    return {
+        "answer": PINECONE_ERROR,
+        "sources": [],
+        "latency_ms": int((time.time() - t0) * 1000),
+        "error": str(error)
+    }
+
+
+def _no_matches_response(pinecone_time: float) -> dict:
+    return {
+        "answer": NO_MATCHES_ERROR,
+        "sources": [],
+        "latency_ms": int(pinecone_time * 1000),
+        "trigger_schedule": True
+    }
+
+
+def _finish_rag(question: str, answer: str, t0: float, pinecone_time: float, llm_time: float, context_stats: dict) -> dict:
+    """Apply the scheduling decision and build a consistent response structure"""
+    response = {
+        "answer": answer,
+        "sources": [],  # Always return empty sources
+        "latency_ms": 0,
+        "details": {
+            "pinecone_ms": int(pinecone_time * 1000),  # retrieval time for either backend
+            "llm_ms": int(llm_time * 1000),
+            "retrieval_backend": RETRIEVAL_BACKEND,
+            **context_stats
+        }
+    }
+
+    if _should_trigger_schedule(question, answer):
+        response["answer"] = SCHEDULE_TRIGGER_ANSWER
+        response["trigger_schedule"] = True
+
+    response["latency_ms"] = int((time.time() - t0) * 1000)
+    return response
+
+
+async def _embed_question(question: str):
+    """Embed a question with the async OpenAI client (None on failure)"""
     try:
-        res = index.search(
-            namespace="__default__",
-            query={"inputs": {"text": question}, "top_k": TOP_K_RESULTS},
-        )
+        async with upstream_slot("llm"):
+            res = await async_client.embeddings.create(model=EMBEDDING_MODEL, input=question)
+        return res.data[0].embedding
     except Exception as e:
-        print(f"Pinecone search error: {e}")
-        return {
-            "answer": PINECONE_ERROR,
-            "sources": [],
-            "latency_ms": int((time.time() - t0) * 1000),
-            "error": str(e)
-        }
-    pinecone_time = time.time() - t0
+        print(f"⚠️ Embedding error: {e}")
+        return None
 
-    matches = res.result["hits"]
-    
 
+async def _answer_cache_lookup(question: str):
+    """Return `(embedding, cached_response)`; the response is None on a miss"""
+    if not ANSWER_CACHE_ENABLED:
+        return None, None
+    t0 = time.time()
+    with span("embedding"):
+        vector = await _embed_question(question)
+    if vector is None:
+        return None, None
+    with span("answer_cache"):
+        hit = answer_cache.lookup(vector)
+    if not hit:
+        return vector, None
+    cached, similarity = hit
+    response = {**cached, "latency_ms": int((time.time() - t0) * 1000)}
+    response["details"] = {**cached.get("details", {}), "cache": "hit", "cache_similarity": round(similarity, 4)}
+    return vector, response
 
-    # Filter matches by similarity score
-    good_matches = [hit for hit in matches if hit.get("_score", 0) > SIMILARITY_THRESHOLD]
-    all_matches = matches  # Use all matches for context to improve coverage
-    
 
+def _answer_cache_store(vector, response: dict):
+    """Cache successful answers; errors and scheduling triggers are never cached"""
+    if vector is None or response.get("error") or response.get("trigger_schedule"):
+        return
+    if response.get("answer") == LLM_ERROR_ANSWER:
+        return
+    answer_cache.store(vector, response)
+
+
+async def _rag_retrieve(question: str) -> dict:
+    """Everything `run_rag_pipeline_async` does before the LLM call
+
+    Returns `{"response": ...}` when the pipeline already has its answer
+    (invalid question, scheduling intent, cache hit, search error, no
+    matches), otherwise the retrieval state the LLM step needs.
+    """
+    question = question.strip()
+
+    invalid = _validate_question(question)
+    if invalid:
+        return {"response": invalid}
+
+    scheduling = _preclassify_schedule(question)
+    if scheduling:
+        return {"response": scheduling}
+
+    t0 = time.time()
+
+    # Pinecone embeds the query itself, so its search runs while the answer
+    # cache is probed and is dropped on a hit. The local index needs the
+    # probe's embedding, so it searches after it.
+    search = asyncio.create_task(_search(question)) if local_index is None else None
+    vector, cached = await _answer_cache_lookup(question)
+    if cached:
+        if search is not None:
+            search.cancel()
+        return {"response": cached, "cache_hit": True}
+
+    try:
+        matches = await (search if search is not None else _search(question, vector))
+    except Exception as e:
+        return {"response": _search_error_response(e, t0)}
+    pinecone_time = time.time() - t0
 
-        
     if not matches:
-        return {
-            "answer": NO_MATCHES_ERROR,
-            "sources": [],
-            "latency_ms": int(pinecone_time * 1000),
-            "trigger_schedule": True
-        }
+        return {"response": _no_matches_response(pinecone_time)}
 
-    # Build context from all matches, prioritizing good matches
-    def extract_text_content(matches):
-        """Extract text content from matches, filtering out empty content"""
-        texts = []
-        
-        for hit in matches:
-            if "text" in hit["fields"] and hit["fields"]["text"].strip():
-                text = hit["fields"]["text"].strip()
-                texts.append(text)
-        
-        return "\n---\n".join(texts)
-    
-    good_context = extract_text_content(good_matches)
-    all_context = extract_text_content(all_matches)
-    
-    # Combine contexts, prioritizing good matches
-    context = good_context + "\n---\n" + all_context if good_context else all_context
-    
+    return {
+        "question": question,
+        "vector": vector,
+        "matches": matches,
+        "t0": t0,
+        "pinecone_time": pinecone_time
+    }
 
-    
 
+async def run_rag_pipeline_async(question: str, retrieval: dict = None) -> dict:
+    """Run the RAG pipeline to answer a question
 
+    Retrieval runs in-process or on Pinecone's bounded thread pool and the
+    LLM call goes through the async OpenAI client, so the event loop stays
+    free while both wait.
+    Paraphrases of recently answered questions are served from the
+    semantic answer cache.
+    `retrieval` is a `_rag_retrieve` result computed ahead of time (see
+    `_moderate_and_retrieve`).
+    """
+    if retrieval is None:
+        retrieval = await _rag_retrieve(question)
+    if "response" in retrieval:
+        return retrieval["response"]
 
+    question = retrieval["question"]
+    vector = retrieval["vector"]
+    t0 = retrieval["t0"]
+    pinecone_time = retrieval["pinecone_time"]
 
-    # Create prompt for LLM
-    def build_prompt(context: str, question: str) -> str:
-        """Build the prompt for the LLM with consistent formatting"""
-        return (
-            "You are a helpful assistant for Aven financial services. Answer questions about Aven products, services, policies, and procedures using the provided information. "
-            "If someone mentions 'Avon' or similar misspellings, assume they mean 'Aven' and provide helpful information about Aven services. "
-            "Answer questions about loan offers, payment estimates, application processes, eligibility, and other financial services topics using the available information. "
-            "If the question is completely unrelated to financial services (like weather, jokes, etc.), politely redirect to Aven topics. "
-            "Be direct and to the point. Use bullet points when listing requirements. "
-            "Keep responses under 100 words. Be brief and actionable.\n\n"
-            "If someone asks to schedule a call or speak to a representative, offer to help schedule.\n\n"
-            f"Information:\n{context}\n\n"
-            f"Question: {question}\n\n"
-            "Answer:"
-        )
-    
-    prompt = build_prompt(context, question)
+    prompt, context_stats = _prepare_prompt(question, retrieval["matches"])
 
-    # Get LLM response
     t1 = time.time()
     try:
-        chat_res = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,  # Reduced from 0.2 for faster, more consistent responses
-            max_tokens=150,   # Reduced from 200 for more concise responses
-            top_p=0.9,        # Add top_p for faster sampling
-            timeout=10,       # Reduced timeout for faster responses
-        )
-        llm_time = time.time() - t1
+        with span("llm"):
+            async with upstream_slot("llm"):
+                chat_res = await async_client.chat.completions.create(**_llm_request(prompt))
         answer = chat_res.choices[0].message.content.strip()
-
     except Exception as e:
         print(f"❌ LLM Error: {e}")
-        llm_time = time.time() - t1
-        answer = "I'm having trouble processing your request right now. Please try again in a moment."
-    
-    # Check if we should trigger scheduling
-    scheduling_keywords = [
-        "schedule", "scheduling", "appointment", "call", "representative", 
-        "speak to someone", "talk to someone", "human", "agent", "support call",
-        "help me", "assist me", "contact", "reach out"
-    ]
-    
-    # Check for scheduling intent in the question
-    question_lower = question.lower()
-    has_scheduling_intent = any(keyword in question_lower for keyword in scheduling_keywords)
-    
-    # Check if LLM response indicates uncertainty or requests for human help
-    uncertainty_indicators = [
-        "i'm not sure about that",
-        "i don't have enough information",
-        "please contact support",
-        "speak to a representative",
-        "call our support team"
-    ]
-    has_uncertainty = any(indicator in answer.lower() for indicator in uncertainty_indicators)
-    
-    # Check for affirmative responses to scheduling offers
-    affirmative_responses = ["yes", "yeah", "sure", "ok", "okay", "yep", "absolutely", "definitely"]
-    is_affirmative_response = any(word in question_lower for word in affirmative_responses)
-    
-    # Check if the LLM response contains scheduling offer indicators
-    scheduling_offer_indicators = [
-        "would you like me to help you schedule",
-        "schedule a call",
-        "help you schedule"
-    ]
-    is_scheduling_offer_response = any(indicator in answer.lower() for indicator in scheduling_offer_indicators)
-    
-    should_trigger_schedule = has_scheduling_intent or has_uncertainty or (is_affirmative_response and is_scheduling_offer_response)
-    
-    # Build response with consistent structure
-    def build_response(answer: str, latency_ms: int, **kwargs):
-        """Build a consistent response structure"""
-        response = {
-            "answer": answer,
-            "sources": [],  # Always return empty sources
-            "latency_ms": latency_ms,
-            "details": {
-                "pinecone_ms": int(pinecone_time * 1000),
-                "llm_ms": int(llm_time * 1000)
+        answer = LLM_ERROR_ANSWER
+    llm_time = time.time() - t1
+
+    result = _finish_rag(question, answer, t0, pinecone_time, llm_time, context_stats)
+    _answer_cache_store(vector, result)
+    return result
+
+async def stream_rag_pipeline(question: str, retrieval: dict = None):
+    """Streaming variant of `run_rag_pipeline_async`
+
+    Yields `(event, data)` pairs: a `metadata` event once retrieval is done,
+    a `token` event per LLM delta as it arrives, and a final `done` event
+    carrying the complete response (including the scheduling decision).
+    """
+    if retrieval is None:
+        retrieval = await _rag_retrieve(question)
+    if retrieval.get("cache_hit"):
+        cached = retrieval["response"]
+        yield "metadata", {"matches": [], "cache": "hit"}
+        yield "token", {"text": cached["answer"]}
+        yield "done", cached
+        return
+    if "response" in retrieval:
+        yield "done", retrieval["response"]
+        return
+
+    question = retrieval["question"]
+    vector = retrieval["vector"]
+    matches = retrieval["matches"]
+    t0 = retrieval["t0"]
+    pinecone_time = retrieval["pinecone_time"]
+
+    yield "metadata", {
+        "matches": [
+            {
+                "id": hit.get("_id"),
+                "score": hit.get("_score", 0),
+                "source": hit.get("fields", {}).get("source")
             }
-        }
-        response.update(kwargs)
-        return response
+            for hit in matches
+        ],
+        "pinecone_ms": int(pinecone_time * 1000)
+    }
 
+    prompt, context_stats = _prepare_prompt(question, matches)
 
+    t1 = time.time()
+    parts = []
+    try:
+        # Spans the whole stream, including the time the client takes to read it
+        with span("llm_stream"):
+            async with upstream_slot("llm"):
+                stream = await async_client.chat.completions.create(**_llm_request(prompt), stream=True)
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield "token", {"text": delta}
+        answer = "".join(parts).strip()
+    except Exception as e:
+        print(f"❌ LLM Error: {e}")
+        answer = LLM_ERROR_ANSWER
+    llm_time = time.time() - t1
 
-    if should_trigger_schedule:
-        answer = "Would you like me to help you schedule a call with our support team? (Reply with Yes or No)"
-        
-        return build_response(
-            answer, 
-            int((time.time() - t0) * 1000),
-            trigger_schedule=should_trigger_schedule
-        )
+    result = _finish_rag(question, answer, t0, pinecone_time, llm_time, context_stats)
+    _answer_cache_store(vector, result)
+    yield "done", result
+
+def _blocked_response(check: dict) -> dict:
+    return {
+        "answer": "I'm sorry, but I can't help with that request.",
+        "sources": [],
+        "violations": check.get("violations", [])
+    }
+
+def _is_scheduling_turn(text: str, schedule_state: dict, booking_key: str = None) -> bool:
+    """An active scheduling flow, or a question about the booking one ended with"""
+    from scheduling_tool.google_calendar import asks_about_booking
+    if schedule_state and schedule_state.get("active", False):
+        return True
+    return bool(booking_key) and asks_about_booking(text)
+
+async def _scheduling_turn(text: str, schedule_state: dict, booking_key: str = None):
+    """
+    Advance a scheduling turn (see `_is_scheduling_turn`) with the text or
+    transcript. Returns the fields every endpoint replies with: `answer`,
+    `schedule_state` (None once the flow is done) and `booking` after a
+    confirmation; None when the session had already ended and the turn is
+    for the normal pipeline.
+    """
+    from scheduling_tool.google_calendar import continue_scheduling_flow, booking_followup
+    if schedule_state and schedule_state.get("active", False):
+        resp = await run_blocking("calendar", continue_scheduling_flow, text, schedule_state)
+    else:
+        resp = await run_blocking("calendar", booking_followup, booking_key)
+    if resp is None:
+        return None
+    turn = {
+        "answer": resp["error"] if resp.get("error") else resp["message"],
+        "schedule_state": None if resp.get("done", False) else resp.get("schedule_state", schedule_state)
+    }
+    if resp.get("booking"):
+        # Key for polling /booking-status while the calendar insert finishes
+        turn["booking"] = resp["booking"]
+    return turn
 
-    return build_response(answer, int((time.time() - t0) * 1000))
+async def _continue_text_scheduling(question: str, schedule_state: dict, booking_key: str = None):
+    """Advance a scheduling turn for a text question (None: not for the flow)"""
+    try:
+        turn = await _scheduling_turn(question, schedule_state, booking_key)
+        return {**turn, "sources": []} if turn is not None else None
+    except Exception as e:
+        print(f"Text Scheduling Error: {e}")
+        return {
+            "answer": SCHEDULING_ERROR,
+            "sources": []
+        }
+
+def _start_text_scheduling(result: dict) -> dict:
+    """
+    If RAG says "trigger_schedule", we START the scheduling flow. Otherwise
+    `schedule_state` is null, which also clears it for a client still
+    sending the state of a session that has ended.
+    """
+    result = {**result, "schedule_state": None}
+    if result.get("trigger_schedule"):
+        from scheduling_tool.google_calendar import start_scheduling_flow
+        try:
+            sched = start_scheduling_flow()
+            result["schedule_state"] = sched.get("schedule_state")
+        except Exception as e:
+            print(f"Text Schedule Start Error: {e}")
+    return result
 
 @app.post("/ask")
 async def ask_question(req: Request):
-    data = await req.json()
+    with start_trace("ask"):
+        return await _ask_question(req)
+
+async def _ask_question(req: Request):
+    with span("parse_request"):
+        data = await req.json()
     question = data.get("question")
     schedule_state = data.get("schedule_state")
+    booking_key = data.get("booking_key")
     
     if not question:
         return {"error": "No question provided."}
     
-    # Use guardrails check
-    check = guardrails_check(question)
+    # Use guardrails check (retrieval is speculated alongside it)
+    check, retrieval = await _moderate_and_retrieve(question, schedule_state)
     if check["blocked"]:
-        reason = check["reason"]
-        violations = check.get("violations", [])
-        return {
-            "answer": "I'm sorry, but I can't help with that request.",
-            "sources": [],
-            "violations": violations
-        }
+        return _blocked_response(check)
     
     # Check if we're in a scheduling flow
-    if schedule_state and schedule_state.get("active", False):
-        from scheduling_tool.google_calendar import continue_scheduling_flow
-        try:
-            resp = continue_scheduling_flow(question, schedule_state)
-            
-            if resp.get("error"):
-                answer = resp["error"]
-            else:
-                answer = resp["message"]
-            
-            result = {
-                "answer": answer,
-                "sources": [],
-                "schedule_state": resp.get("schedule_state", schedule_state) if not resp.get("done", False) else None
-            }
-            return result
-            
-        except Exception as e:
-            print(f"Text Scheduling Error: {e}")
-            return {
-                "answer": "Sorry, there was an error with scheduling. Let me help you another way.",
-                "sources": []
-            }
+    if _is_scheduling_turn(question, schedule_state, booking_key):
+        with span("scheduling_flow"):
+            reply = await _continue_text_scheduling(question, schedule_state, booking_key)
+        if reply is not None:
+            return reply
     
     # Normal RAG flow
-    result = run_rag_pipeline(question)
-    
-    # If RAG says "trigger_schedule", we START the scheduling flow
-    if result.get("trigger_schedule"):
-        from scheduling_tool.google_calendar import start_scheduling_flow
-        try:
-            sched = start_scheduling_flow()
-            result["schedule_state"] = sched.get("schedule_state")
-        except Exception as e:
-            print(f"Text Schedule Start Error: {e}")
-    
-    return result
+    result = await run_rag_pipeline_async(question, retrieval)
+    return _start_text_scheduling(result)
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _traced(name: str, handler):
+    """
+    Trace `handler` like `start_trace`, except that a streaming response
+    keeps the trace open until its body has been sent, so the work done
+    while streaming (LLM tokens, TTS) shows up in `/traces/slow`.
+    """
+    trace = Trace(name)
+    try:
+        with resume_trace(trace, finish=False):
+            response = await handler
+    except BaseException:
+        finish_trace(trace)
+        raise
+    if not isinstance(response, StreamingResponse):
+        finish_trace(trace)
+        return response
+
+    body = response.body_iterator
+
+    async def traced_body():
+        with resume_trace(trace):
+            async for chunk in body:
+                yield chunk
+
+    response.body_iterator = traced_body()
+    return response
+
+@app.post("/ask/stream")
+async def ask_question_stream(req: Request):
+    """
+    Same contract as `/ask`, streamed as Server-Sent Events:
+    `metadata` (retrieval hits) ➜ `token`* (LLM deltas) ➜ `done` (full
+    response incl. `trigger_schedule` / `schedule_state`).
+    """
+    return await _traced("ask-stream", _ask_question_stream(req))
+
+async def _ask_question_stream(req: Request):
+    data = await req.json()
+    question = data.get("question")
+    schedule_state = data.get("schedule_state")
+    booking_key = data.get("booking_key")
+
+    async def events():
+        if not question:
+            yield _sse("done", {"error": "No question provided."})
+            return
+
+        check, retrieval = await _moderate_and_retrieve(question, schedule_state)
+        if check["blocked"]:
+            yield _sse("done", _blocked_response(check))
+            return
+
+        if _is_scheduling_turn(question, schedule_state, booking_key):
+            reply = await _continue_text_scheduling(question, schedule_state, booking_key)
+            if reply is not None:
+                yield _sse("done", reply)
+                return
+
+        async for event, payload in stream_rag_pipeline(question, retrieval):
+            if event == "done":
+                payload = _start_text_scheduling(payload)
+            yield _sse(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ---------- speech helpers ----------
+def _clean_for_speech(text: str) -> str:
+    """Strip markdown characters that TTS would read aloud"""
+    return text.replace("**", "").replace("*", "").replace("- ", "").replace("#", "")
+
+async def _audio_to_text(blob: bytes, language: str = "en") -> str:
+    """Transcribe audio with Whisper without blocking the event loop"""
+    audio_file = io.BytesIO(blob)
+    audio_file.name = "audio.webm"
+    params = {"language": language} if language else {}
+    with span("stt", bytes=len(blob)):
+        async with upstream_slot("audio"):
+            return await async_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                response_format="text",
+                **params
+            )
+
+# Cleaned text of every fixed voice prompt, whole and per sentence (built on first use)
+_canned_speech = None
+
+def _canned_prompts() -> set:
+    """Fixed voice prompts (scheduling messages, error fallbacks), whole and per sentence"""
+    from scheduling_tool.google_calendar import CANNED_MESSAGES
+    texts = set()
+    for message in CANNED_MESSAGES + [NO_MATCHES_ERROR, SCHEDULING_ERROR, VOICE_RAG_ERROR,
+                                      EMPTY_QUESTION_ERROR, PINECONE_ERROR, LLM_ERROR_ANSWER]:
+        texts.add(message)
+        texts.update(split_sentences(message))
+    return texts
+
+def _tts_cacheable(clean: str) -> bool:
+    """
+    Only fixed prompts are cached. Free-form answers rarely repeat, and
+    confirmations carry the caller's name, email and phone, which must not
+    end up in the cache (or on disk).
+    """
+    global _canned_speech
+    if _canned_speech is None:
+        _canned_speech = {_clean_for_speech(text) for text in _canned_prompts()}
+    return clean in _canned_speech
+
+async def _text_to_audio(text: str, voice: str = VOICE_NAME, speed: float = VOICE_SPEED) -> bytes:
+    """Synthesize speech with OpenAI TTS without blocking the event loop
+
+    Fixed prompts are cached, so they cost no TTS latency.
+    """
+    clean = _clean_for_speech(text)
+    key = TTSCache.key(clean, voice, speed, "mp3")
+    cacheable = _tts_cacheable(clean)
+    cached = await tts_cache.get_async(key) if cacheable else None
+    if cached is not None:
+        return cached
+    try:
+        with span("tts", chars=len(clean)):
+            async with upstream_slot("audio"):
+                response = await async_client.audio.speech.create(
+                    model="tts-1",
+                    voice=voice,
+                    input=clean,
+                    response_format="mp3",
+                    speed=speed
+                )
+        if cacheable:
+            await tts_cache.put_async(key, response.content)
+        return response.content
+    except Exception as e:
+        print(f"❌ TTS Error: {e}")
+        raise e
+
+async def _stream_text_to_audio(text: str, voice: str = VOICE_NAME, speed: float = VOICE_SPEED):
+    """Yield mp3 bytes in chunks as OpenAI produces them (cached prompts are replayed)"""
+    clean = _clean_for_speech(text)
+    key = TTSCache.key(clean, voice, speed, "mp3")
+    cacheable = _tts_cacheable(clean)
+    cached = await tts_cache.get_async(key) if cacheable else None
+    if cached is not None:
+        for i in range(0, len(cached), AUDIO_CHUNK_BYTES):
+            yield cached[i:i + AUDIO_CHUNK_BYTES]
+        return
+    parts = []
+    try:
+        with span("tts_stream", chars=len(clean)):
+            async with upstream_slot("audio"):
+                async with async_client.audio.speech.with_streaming_response.create(
+                    model="tts-1",
+                    voice=voice,
+                    input=clean,
+                    response_format="mp3",
+                    speed=speed
+                ) as response:
+                    async for chunk in response.iter_bytes(AUDIO_CHUNK_BYTES):
+                        parts.append(chunk)
+                        yield chunk
+    except Exception as e:
+        # Re-raised so a response that already started is aborted rather
+        # than ending as a clean, truncated 200
+        print(f"❌ TTS Stream Error: {e}")
+        raise
+    if cacheable:
+        await tts_cache.put_async(key, b"".join(parts))
+
+async def _prewarm_tts_cache():
+    """Synthesize every fixed voice prompt (whole and per sentence) ahead of time"""
+    texts = _canned_prompts()
+    results = await asyncio.gather(*(_text_to_audio(t) for t in texts), return_exceptions=True)
+    failed = sum(isinstance(r, Exception) for r in results)
+    print(f"✅ TTS cache pre-warmed with {len(texts) - failed}/{len(texts)} canned prompts")
 
 @app.post("/stt")
 async def speech_to_text(audio: UploadFile = File(...)):
     """Convert speech to text using OpenAI's Whisper model"""
     try:
         audio_data = await audio.read()
-        audio_file = io.BytesIO(audio_data)
-        audio_file.name = "audio.webm"
-        
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="text"
-        )
+        transcript = await _audio_to_text(audio_data, language=None)
         
         return {"transcript": transcript}
         
@@ -366,57 +892,98 @@ async def voice_ask(
     request: Request,
     audio: UploadFile = File(...)
 ):
+    return await _traced("voice-ask", _voice_ask(request, audio))
+
+async def _voice_ask(request: Request, audio: UploadFile):
     """
     STT ➜ RAG ➜ decide if we need to schedule
     If `schedule_state` exists we continue the voice scheduling flow,
     otherwise we fall back to plain RAG (+TTS).
+
+    Form field `response_format`: "json" (default, base64 audio in the body)
+    or "binary" (chunked audio/mpeg body, metadata in X-* headers).
     """
-    # ---------- helpers ----------
-    def _audio_to_text(blob: bytes) -> str:
-        audio_file = io.BytesIO(blob)
-        audio_file.name = "audio.webm"
-        return client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="text",
-            language="en"
-        )
+    # ---------- 1 & 2.  STT + scheduling state ----------
+    transcript, schedule_state, booking_key, error = await _read_voice_turn(request, audio)
+    if error:
+        return error
+
+    form_data = await request.form()
+    binary = form_data.get("response_format", "json") == "binary"
 
-    def _text_to_audio(text: str) -> bytes:
+    async def reply(answer: str, speech: str = None, **kw):
+        """Speak `speech` (defaults to `answer`) in the requested format"""
+        speech = speech or answer
+        if binary:
+            return await _voice_binary(transcript, answer, speech, **kw)
+        audio_out = await _text_to_audio(speech)
+        return _voice_json(transcript, answer, audio_out, **kw)
+
+    # ---------- 3a.  Scheduling branch ----------
+    if _is_scheduling_turn(transcript, schedule_state, booking_key):
+        print(f"🎤 Entering scheduling branch with transcript: '{transcript}'")
         try:
-            clean = text.replace("**", "").replace("*", "").replace("- ", "").replace("#", "")
-            response = client.audio.speech.create(
-                model="tts-1",
-                voice="alloy",
-                input=clean,
-                response_format="mp3",
-                speed=1.1
-            )
-            return response.content
+            with span("scheduling_flow"):
+                turn = await _scheduling_turn(transcript, schedule_state, booking_key)
+            if turn is not None:
+                return await reply(turn.pop("answer"), **turn)
         except Exception as e:
-            print(f"❌ TTS Error: {e}")
-            raise e
+            print(f"Scheduling Error: {e}")
+            return await reply("Sorry, there was an error with scheduling.", SCHEDULING_ERROR)
 
-    # ---------- 1.  STT ----------
+    # ---------- 3b.  Normal RAG branch ----------
+    print(f"🎤 Entering RAG branch with transcript: '{transcript}'")
+    try:
+        rag = await run_rag_pipeline_async(transcript)
+    except Exception as e:
+        print(f"❌ RAG pipeline error: {e}")
+        return await reply(VOICE_RAG_ERROR)
+
+    # If RAG says "trigger_schedule", we START the scheduling flow
+    if rag.get("trigger_schedule"):
+        print(f"🎤 RAG triggered scheduling for transcript: '{transcript}'")
+        from scheduling_tool.google_calendar import start_scheduling_flow
+        try:
+            sched = start_scheduling_flow()
+            speech = sched["message"]
+            print(f"🎤 Starting scheduling flow with state: {sched.get('schedule_state')}")
+            return await reply(speech, schedule_state=sched.get("schedule_state"))
+        except Exception as e:
+            print(f"Schedule Start Error: {e}")
+
+    # Plain answer
+    speech = rag["answer"]
+    sources = rag.get("sources", [])
+    return await reply(speech, sources=sources, schedule_state=None)
+
+async def _read_voice_turn(request: Request, audio: UploadFile):
+    """Transcribe the uploaded audio and parse `schedule_state` and `booking_key` from the form
+
+    Returns `(transcript, schedule_state, booking_key, error_response)`.
+    """
+    # ---------- STT ----------
     try:
         audio_blob = await audio.read()
         
         if len(audio_blob) == 0:
-            return _voice_error("No audio data received.", "Empty audio blob")
+            return "", {}, None, _voice_error("No audio data received.", "Empty audio blob")
         
-        transcript = _audio_to_text(audio_blob).strip()
+        transcript = (await _audio_to_text(audio_blob)).strip()
         
         if not transcript or len(transcript.strip()) < 3:
-            return _voice_error("I couldn't hear anything. Please try speaking again.", "Empty or too short transcript")
+            return "", {}, None, _voice_error("I couldn't hear anything. Please try speaking again.", "Empty or too short transcript")
             
     except Exception as e:
         print(f"❌ STT Error: {e}")
-        return _voice_error("I couldn't understand that audio.", str(e))
+        return "", {}, None, _voice_error("I couldn't understand that audio.", str(e))
 
-    # ---------- 2.  Check for scheduling state ----------
+    # ---------- Check for scheduling state ----------
     schedule_state = {}
+    booking_key = None
     try:
-        form_data = await request.form()
+        with span("form_parse"):
+            form_data = await request.form()
+        booking_key = form_data.get("booking_key") or None
         if "schedule_state" in form_data:
             schedule_state = json.loads(form_data["schedule_state"])
             print(f"🎤 Voice scheduling state: {schedule_state}")
@@ -425,66 +992,136 @@ async def voice_ask(
     except Exception as e:
         print(f"❌ Error parsing schedule_state: {e}")
 
-    # ---------- 3a.  Scheduling branch ----------
-    if schedule_state and schedule_state.get("active", False):
-        print(f"🎤 Entering scheduling branch with transcript: '{transcript}'")
-        from scheduling_tool.google_calendar import continue_scheduling_flow
-        try:
-            resp = continue_scheduling_flow(transcript, schedule_state)
+    return transcript, schedule_state, booking_key, None
 
-            if resp.get("error"):
-                speech = resp["error"]
-            else:
-                speech = resp["message"]
+async def _speak_in_order(segments):
+    """
+    Synthesize `(sentence, replace)` pairs from an async source concurrently,
+    yielding `(sentence, replace, audio_bytes)` in source order. TTS for a
+    sentence starts as soon as the source produces it, so audio for early
+    sentences is ready while later ones are still being generated.
+    """
+    queue = asyncio.Queue()
 
-            audio_out = _text_to_audio(speech)
-            response = _voice_json(transcript, speech, audio_out)
-            
-            if resp.get("done", False):
-                response["schedule_state"] = None
-            else:
-                response["schedule_state"] = resp.get("schedule_state", schedule_state)
-                
-            return response
-            
-        except Exception as e:
-            print(f"Scheduling Error: {e}")
-            audio_out = _text_to_audio("Sorry, there was an error with scheduling. Let me help you another way.")
-            return _voice_json(transcript, "Sorry, there was an error with scheduling.", audio_out)
+    async def produce():
+        try:
+            async for sentence, replace in segments:
+                task = asyncio.create_task(_text_to_audio(sentence))
+                await queue.put((sentence, replace, task))
+        finally:
+            await queue.put(None)
 
-    # ---------- 3b.  Normal RAG branch ----------
-    print(f"🎤 Entering RAG branch with transcript: '{transcript}'")
+    producer = asyncio.create_task(produce())
     try:
-        rag = run_rag_pipeline(transcript)
-    except Exception as e:
-        print(f"❌ RAG pipeline error: {e}")
-        speech = "Sorry, I'm having trouble processing your request right now. Please try again."
-        audio_out = _text_to_audio(speech)
-        return _voice_json(transcript, speech, audio_out)
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            sentence, replace, task = item
+            try:
+                audio_out = await task
+            except Exception as e:
+                print(f"❌ Sentence TTS failed, skipping: {e}")
+                continue
+            yield sentence, replace, audio_out
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[2].cancel()
 
-    # If RAG says "trigger_schedule", we START the scheduling flow
-    if rag.get("trigger_schedule"):
-        print(f"🎤 RAG triggered scheduling for transcript: '{transcript}'")
-        from scheduling_tool.google_calendar import start_scheduling_flow
-        try:
-            sched = start_scheduling_flow()
-            speech = sched["message"]
-            audio_out = _text_to_audio(speech)
-            print(f"🎤 Starting scheduling flow with state: {sched.get('schedule_state')}")
-            return _voice_json(
-                transcript,
-                speech,
-                audio_out,
-                schedule_state=sched.get("schedule_state")
-            )
-        except Exception as e:
-            print(f"Schedule Start Error: {e}")
+@app.post("/voice-ask/stream")
+async def voice_ask_stream(
+    request: Request,
+    audio: UploadFile = File(...)
+):
+    """
+    Pipelined variant of `/voice-ask`, streamed as Server-Sent Events:
+    `transcript` ➜ `audio`* (one mp3 segment per sentence, in order) ➜ `done`.
+    LLM tokens are cut into sentences as they arrive and each sentence is
+    synthesized while the next one is still being generated. An `audio`
+    event with `replace: true` means earlier segments should be dropped
+    (the answer turned into a scheduling offer).
+    """
+    return await _traced("voice-ask-stream", _voice_ask_stream(request, audio))
 
-    # Plain answer
-    speech = rag["answer"]
-    sources = rag.get("sources", [])
-    audio_out = _text_to_audio(speech)
-    return _voice_json(transcript, speech, audio_out, sources=sources)
+async def _voice_ask_stream(request: Request, audio: UploadFile):
+    transcript, schedule_state, booking_key, error = await _read_voice_turn(request, audio)
+    if error:
+        return error
+
+    outcome = {"answer": "", "sources": [], "schedule_state": None}
+
+    async def segments():
+        # ---------- Scheduling branch ----------
+        if _is_scheduling_turn(transcript, schedule_state, booking_key):
+            try:
+                turn = await _scheduling_turn(transcript, schedule_state, booking_key)
+            except Exception as e:
+                print(f"Scheduling Error: {e}")
+                turn = {"answer": SCHEDULING_ERROR}
+            if turn is not None:
+                outcome.update(turn)
+                for sentence in split_sentences(outcome["answer"]):
+                    yield sentence, False
+                return
+
+        # ---------- RAG branch ----------
+        splitter = SentenceSplitter()
+        spoken = False
+        result = {}
+        async for event, payload in stream_rag_pipeline(transcript):
+            if event == "token":
+                for sentence in splitter.feed(payload["text"]):
+                    spoken = True
+                    yield sentence, False
+            elif event == "done":
+                result = payload
+        for sentence in splitter.flush():
+            spoken = True
+            yield sentence, False
+
+        outcome["answer"] = result.get("answer", "")
+        outcome["sources"] = result.get("sources", [])
+        replacement = None
+        if result.get("trigger_schedule"):
+            from scheduling_tool.google_calendar import start_scheduling_flow
+            try:
+                sched = start_scheduling_flow()
+                replacement = sched["message"]
+                outcome["schedule_state"] = sched.get("schedule_state")
+            except Exception as e:
+                print(f"Schedule Start Error: {e}")
+                replacement = result.get("answer", "")
+        elif not spoken:
+            # Nothing was streamed (validation / retrieval errors): speak the final answer
+            replacement = result.get("answer", "")
+        if replacement:
+            outcome["answer"] = replacement
+            for i, sentence in enumerate(split_sentences(replacement)):
+                yield sentence, spoken and i == 0
+
+    async def events():
+        yield _sse("transcript", {"transcript": transcript})
+        index = 0
+        async for sentence, replace, audio_out in _speak_in_order(segments()):
+            yield _sse("audio", {
+                "index": index,
+                "text": sentence,
+                "replace": replace,
+                "audio_data": base64.b64encode(audio_out).decode(),
+                "audio_format": "mp3"
+            })
+            index += 1
+        yield _sse("done", {"transcript": transcript, **outcome})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ---------- tiny helpers ----------
 def _voice_json(transcript: str, answer: str, audio_bytes: bytes, **kw):
@@ -496,6 +1133,44 @@ def _voice_json(transcript: str, answer: str, audio_bytes: bytes, **kw):
         **kw
     }
 
+async def _voice_binary(transcript: str, answer: str, speech: str, **kw):
+    """Chunked audio/mpeg response; text fields travel as URL-encoded X-* headers
+    (`schedule_state` / `sources` as URL-encoded JSON).
+
+    The first audio chunk is produced before the response starts: if TTS
+    fails up front the turn is answered with a 502 JSON body carrying the
+    text fields and the error. A failure after that aborts the chunked
+    body, so clients see a broken transfer instead of a short mp3.
+    """
+    headers = {
+        "X-Transcript": quote(transcript),
+        "X-Answer": quote(answer),
+        "X-Audio-Format": "mp3",
+        "Cache-Control": "no-cache"
+    }
+    for name, value in kw.items():
+        headers["X-" + name.replace("_", "-").title()] = quote(json.dumps(value))
+    stream = _stream_text_to_audio(speech)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except Exception as e:
+        return JSONResponse(status_code=502, content={
+            "transcript": transcript,
+            "answer": answer,
+            "audio_data": "",
+            "error": f"Text-to-speech failed: {e}",
+            **kw
+        })
+
+    async def body():
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
+
 def _voice_error(msg: str, details: str):
     return {
         "transcript": "",
@@ -515,17 +1190,10 @@ async def text_to_speech(req: Request):
         if not text:
             return {"error": "No text provided"}
         
-        clean_text = text.replace("**", "").replace("*", "").replace("- ", "").replace("#", "")
-        
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=clean_text,
-            response_format="mp3"
-        )
+        audio_bytes = await _text_to_audio(text, voice=voice, speed=1.0)
         
         return StreamingResponse(
-            io.BytesIO(response.content),
+            io.BytesIO(audio_bytes),
             media_type="audio/mpeg",
             headers={"Content-Disposition": "attachment; filename=speech.mp3"}
         )
@@ -536,11 +1204,16 @@ async def text_to_speech(req: Request):
 
 @app.post("/schedule-support-call")
 async def schedule_support_call(req: ScheduleRequest):
-    return schedule_support_event(req)
+    return await run_blocking("calendar", schedule_support_event, req)
+
+@app.get("/booking-status/{key}")
+async def booking_status(key: str):
+    """Status of a booking queued by the scheduling flow: pending, booked or failed"""
+    return get_booking_status(key)
 
 @app.get("/available-times")
 async def available_times():
-    return get_available_times()
+    return await run_blocking("calendar", get_available_times)
 
 @app.get("/health")
 async def health_check():
@@ -554,10 +1227,40 @@ async def health_check():
 async def performance_metrics():
     """Get performance metrics"""
     return {
-        "status": "no_cache_enabled",
+        "status": "cache_enabled" if ANSWER_CACHE_ENABLED else "no_cache_enabled",
+        "answer_cache": answer_cache.stats(),
+        "tts_cache": tts_cache.stats(),
+        "moderation_cache": moderation_cache.stats(),
+        "moderation_batcher": moderation_batcher.stats() if moderation_batcher else None,
+        "local_classifier": local_classifier.stats() if local_classifier else None,
+        "availability_cache": availability_cache.stats(),
+        "slot_holds": reservation_ledger.stats(),
+        "booking_queue": booking_queue.stats(),
         "timestamp": time.time()
     }
 
+@app.get("/traces/slow")
+async def slow_request_traces(limit: int = 20):
+    """Stage-by-stage waterfalls of the slowest recent /ask and /voice-ask requests"""
+    return {
+        "recorded": slow_traces.recorded,
+        "traces": slow_traces.slowest(limit)
+    }
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(x_admin_token: str = Header(None)):
+    """Drop cached answers; called by the ingestion pipeline after re-upload
+
+    Disabled unless CACHE_ADMIN_TOKEN is set. Only clears the cache of the
+    worker that receives the request.
+    """
+    if not CACHE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Cache invalidation is disabled.")
+    if x_admin_token != CACHE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    answer_cache.invalidate()
+    return {"status": "invalidated", "timestamp": time.time()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
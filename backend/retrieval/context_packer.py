@@ -0,0 +1,86 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+
+# ---------- Token-Budgeted Context Assembly ----------
+
+CONTEXT_SEPARATOR = "\n---\n"
+
+_encoder = None
+
+
+def _get_encoder():
+    """Loads the tokenizer once; None if it cannot be loaded (e.g. offline)"""
+    global _encoder
+    if _encoder is None:
+        try:
+            _encoder = tiktoken.encoding_for_model("gpt-4o-mini")
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable, estimating token counts: {e}")
+            _encoder = False
+    return _encoder or None
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with the model's tokenizer (~4 chars/token if unavailable)"""
+    encoder = _get_encoder()
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text))
+
+
+@lru_cache(maxsize=4096)
+def _chunk_tokens(text: str) -> int:
+    """Cached because the same chunks are retrieved over and over"""
+    return count_tokens(text)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    return encoder.decode(encoder.encode(text)[:max_tokens])
+
+
+def pack_context(matches: List[Dict], token_budget: int) -> Tuple[str, Dict]:
+    """
+    Builds the prompt context from retrieval hits:
+        - drops empty chunks and duplicates (same id or same text)
+        - orders the rest by score, best first
+        - adds chunks while they fit in `token_budget` tokens
+
+    Returns the context string and packing stats
+    (`context_tokens`, `chunks_used`, `chunks_dropped`).
+    """
+    seen_ids = set()
+    seen_texts = set()
+    unique = []
+    for hit in sorted(matches, key=lambda h: h.get("_score", 0), reverse=True):
+        text = hit.get("fields", {}).get("text", "").strip()
+        hit_id = hit.get("_id")
+        if not text or text in seen_texts or (hit_id is not None and hit_id in seen_ids):
+            continue
+        seen_texts.add(text)
+        if hit_id is not None:
+            seen_ids.add(hit_id)
+        unique.append(text)
+
+    separator_tokens = _chunk_tokens(CONTEXT_SEPARATOR)
+    packed = []
+    used = 0
+    for text in unique:
+        cost = _chunk_tokens(text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(text)
+            used += cost
+        elif not packed:
+            # Best chunk alone is over budget: keep its head rather than nothing
+            packed.append(_truncate(text, token_budget))
+            used = token_budget
+
+    return CONTEXT_SEPARATOR.join(packed), {
+        "context_tokens": used,
+        "chunks_used": len(packed),
+        "chunks_dropped": len(unique) - len(packed)
+    }
@@ -0,0 +1,70 @@
+import json
+from typing import Dict, List
+
+import numpy as np
+
+# ---------- In-Process Vector Index ----------
+
+class LocalVectorIndex:
+    """
+    Serves top-k retrieval from memory. Chunk embeddings are L2-normalized
+    into one contiguous float32 matrix so cosine similarity for every chunk
+    is a single matrix-vector product.
+
+    Hits use the same shape as Pinecone's `index.search` results
+    (`_id`, `_score`, `fields.text`, `fields.source`) so the rest of the
+    pipeline does not care which backend answered.
+    """
+
+    def __init__(self, texts: List[str], sources: List[str], embeddings, model: str = ""):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got array of shape {matrix.shape}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._matrix = np.ascontiguousarray(matrix / norms)
+        self._texts = texts
+        self._sources = sources
+        self.model = model
+
+    @classmethod
+    def from_files(cls, chunks_path: str, embeddings_path: str) -> "LocalVectorIndex":
+        """
+        Loads `aven_chunked.json` and the `.npz` written by
+        `data-ingestion/embed_chunks.py` (rows aligned with the chunk list).
+        """
+        with open(chunks_path, "r") as f:
+            chunks = json.load(f)
+        data = np.load(embeddings_path)
+        texts = [chunk["text"] for chunk in chunks]
+        sources = [chunk.get("metadata", {}).get("source", "") for chunk in chunks]
+        model = str(data["model"]) if "model" in data.files else ""
+        return cls(texts, sources, data["embeddings"], model=model)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    def search(self, vector, top_k: int) -> List[Dict]:
+        """Returns the `top_k` chunks most similar to `vector`, best first"""
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        if norm:
+            v = v / norm
+        scores = self._matrix @ v
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "_id": f"aven-{i}",
+                "_score": float(scores[i]),
+                "fields": {"text": self._texts[i], "source": self._sources[i]}
+            }
+            for i in top
+        ]
@@ -0,0 +1,185 @@
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# ---------- Slot Availability Cache ----------
+
+class AvailabilityCache:
+    """
+    Holds the most recently computed list of open slots, with the agents
+    free at each, for `ttl_seconds`.
+
+    Concurrent misses are collapsed into one load (the others wait for it),
+    so calendar API usage does not grow with traffic. Bookings write through
+    with `claim` (or `mark_busy` when the cache is cold), which takes the
+    booked agent off the overlapping slots (dropping slots nobody is left
+    free for) immediately instead of waiting for the TTL; `release` puts
+    them back if the booking fails. Slots that have started are never
+    returned.
+
+    Slots are looked up by instant, so the same start written with another
+    UTC offset finds the cached slot. A start that was not among the loaded
+    slots is something the cache cannot tell about, while a loaded slot that
+    has since been dropped is known to be fully booked.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, slot_minutes: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.slot_length = timedelta(minutes=slot_minutes)
+        self._slots: Optional[List[tuple]] = None  # [(start datetime, iso string, free agents)]
+        self._loaded: Dict[datetime, str] = {}  # start -> iso string of every slot in the last load
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.write_throughs = 0
+
+    def _is_cold(self) -> bool:
+        return self._slots is None or self._expires_at <= time.time()
+
+    def _fresh(self, now: datetime) -> Optional[List[str]]:
+        if self._is_cold():
+            return None
+        return [iso for start, iso, _ in self._slots if start > now]
+
+    def get(self) -> Optional[List[str]]:
+        now = datetime.now().astimezone()
+        with self._lock:
+            slots = self._fresh(now)
+            if slots is not None:
+                self.hits += 1
+            return slots
+
+    def free_agents(self, iso: str) -> Optional[List[str]]:
+        """Agents free at a cached slot; None when the cache cannot tell"""
+        start = datetime.fromisoformat(iso)
+        with self._lock:
+            if self._is_cold() or start not in self._loaded:
+                return None
+            for slot, _, agents in self._slots:
+                if slot == start:
+                    return list(agents)
+            return []
+
+    def put(self, slots: List[tuple]):
+        """`slots` are `(iso start, free agents)` pairs in time order"""
+        parsed = [(datetime.fromisoformat(iso), iso, list(agents)) for iso, agents in slots]
+        with self._lock:
+            self._slots = parsed
+            self._loaded = {start: iso for start, iso, _ in parsed}
+            self._expires_at = time.time() + self.ttl_seconds
+
+    def get_or_load(self, load: Callable[[], List[tuple]]) -> List[str]:
+        """Cached slots, or the result of `load()` (one caller loads at a time)"""
+        slots = self.get()
+        if slots is not None:
+            return slots
+        with self._load_lock:
+            # Another caller may have loaded while we waited
+            slots = self.get()
+            if slots is not None:
+                return slots
+            with self._lock:
+                self.misses += 1
+                self.loads += 1
+            slots = load()
+            self.put(slots)
+            # Answer from what was loaded: with a zero TTL the cache is already stale
+            now = datetime.now().astimezone()
+            return [iso for iso, _ in slots if datetime.fromisoformat(iso) > now]
+
+    def mark_busy(self, start: datetime, end: Optional[datetime] = None, agent: Optional[str] = None):
+        """
+        Write-through for a booking: `agent` is no longer free for any cached
+        slot overlapping [start, end). Without an agent the slots are dropped.
+        """
+        end = end or start + self.slot_length
+        with self._lock:
+            if self._slots is None:
+                return
+            slots = []
+            for slot, iso, agents in self._slots:
+                if slot < end and slot + self.slot_length > start:
+                    agents = [a for a in agents if a != agent] if agent else []
+                if agents:
+                    slots.append((slot, iso, agents))
+            self._slots = slots
+            self.write_throughs += 1
+
+    def claim(self, iso: str, pick: Callable[[List[str]], Optional[str]]) -> Optional[str]:
+        """
+        Choose an agent for a booking with `pick(free agents)` and mark them
+        busy in one step, so concurrent bookings of the same slot never get
+        the same agent. Returns None when the slot has no free agent; raises
+        LookupError when the cache is cold or the slot was not loaded, so it
+        cannot tell.
+        """
+        start = datetime.fromisoformat(iso)
+        end = start + self.slot_length
+        with self._lock:
+            if self._is_cold():
+                raise LookupError("availability cache is cold")
+            if start not in self._loaded:
+                raise LookupError(f"{iso} is not a cached slot")
+            free = next((agents for slot, _, agents in self._slots if slot == start), [])
+            agent = pick(free) if free else None
+            if agent is None:
+                return None
+            slots = []
+            for slot, slot_iso, agents in self._slots:
+                if slot < end and slot + self.slot_length > start:
+                    agents = [a for a in agents if a != agent]
+                if agents:
+                    slots.append((slot, slot_iso, agents))
+            self._slots = slots
+            self.write_throughs += 1
+            return agent
+
+    def release(self, iso: str, agent: str):
+        """
+        Undo a `claim` whose booking failed: `agent` is free again for the
+        slot at `iso` (restored if it had been dropped) and the cached slots
+        overlapping it.
+        """
+        start = datetime.fromisoformat(iso)
+        end = start + self.slot_length
+        with self._lock:
+            if self._slots is None:
+                return
+            iso = self._loaded.get(start, iso)
+            slots = []
+            restored = False
+            for slot, slot_iso, agents in self._slots:
+                if not restored and slot > start:
+                    slots.append((start, iso, [agent]))
+                    restored = True
+                if slot == start:
+                    restored = True
+                if slot < end and slot + self.slot_length > start and agent not in agents:
+                    agents = agents + [agent]
+                slots.append((slot, slot_iso, agents))
+            if not restored:
+                slots.append((start, iso, [agent]))
+            self._slots = slots
+
+    def invalidate(self):
+        with self._lock:
+            self._slots = None
+            self._loaded = {}
+            self._expires_at = 0.0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "cached_slots": len(self._slots) if self._slots is not None else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "calendar_loads": self.loads,
+                "write_throughs": self.write_throughs
+            }
@@ -0,0 +1,131 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# ---------- Background Booking Queue ----------
+
+
+def booking_key(session_id: str, slot: str) -> str:
+    """
+    Idempotency key for booking `slot` in a scheduling session. Lowercase
+    hex, so it is also a valid Google Calendar event id (base32hex).
+    """
+    return hashlib.sha256(f"{session_id}|{slot}".encode("utf-8")).hexdigest()[:32]
+
+
+class BookingQueue:
+    """
+    Runs `book(request)` on a small worker pool so the confirmation turn can
+    be answered before the calendar insert finishes.
+
+    Jobs are keyed by idempotency key: submitting a key that is already
+    pending or booked returns that job instead of booking again, and a
+    failed job may be resubmitted. Finished jobs are kept for
+    `ttl_seconds` (at most `max_jobs`) so their status can be looked up.
+
+    Jobs live in this process only; `publish(status)` is called when a job
+    is queued and again when it finishes, so the status can be shared with
+    other workers.
+    """
+
+    def __init__(self, book: Callable[[Any], Dict], workers: int = 4,
+                 ttl_seconds: float = 3600, max_jobs: int = 10000,
+                 publish: Optional[Callable[[Dict], None]] = None):
+        self.book = book
+        self.publish = publish
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calendar-booking")
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.booked = 0
+        self.failed = 0
+
+    def submit(self, key: str, request, on_done: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Queue a booking (or return the existing job for `key`); returns the job's status"""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            job = self._jobs.get(key)
+            if job is not None and job["status"] != "failed":
+                self.deduplicated += 1
+                return self._public(job)
+            job = {"key": key, "status": "pending", "submitted_at": now}
+            # Published before the job can start, so the pending status
+            # never overwrites the outcome
+            if self.publish is not None:
+                self.publish(dict(job))
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self.submitted += 1
+            job["future"] = self._pool.submit(self._run, key, request, on_done)
+            return self._public(job)
+
+    def _run(self, key: str, request, on_done):
+        try:
+            result = self.book(request)
+        except Exception as e:
+            result = {"error": "Failed to schedule call.", "details": str(e)}
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                job["finished_at"] = time.time()
+                if "error" in result:
+                    job.update(status="failed", error=result["error"], details=result.get("details"))
+                    self.failed += 1
+                else:
+                    job.update(status="booked", event_link=result.get("event_link"), agent=result.get("agent"))
+                    self.booked += 1
+                job = self._public(job)
+        if job is not None and self.publish is not None:
+            try:
+                self.publish(job)
+            except Exception as e:
+                print(f"[ERROR] publishing booking {key}: {e}")
+        if on_done is not None:
+            on_done(result)
+
+    def _prune(self, now: float):
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if len(self._jobs) <= self.max_jobs and (oldest["status"] == "pending" or now - oldest["submitted_at"] < self.ttl_seconds):
+                break
+            self._jobs.popitem(last=False)
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        return {k: v for k, v in job.items() if k != "future"}
+
+    def status(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return self._public(job) if job is not None else None
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        """The job's status once it finishes, or after `timeout` seconds if it has not"""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return None
+        future = job.get("future")
+        if future is not None and timeout > 0:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.status(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": sum(1 for job in self._jobs.values() if job["status"] == "pending"),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "booked": self.booked,
+                "failed": self.failed
+            }
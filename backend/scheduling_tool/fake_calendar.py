@@ -0,0 +1,163 @@
+import os
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# ---------- Offline Calendar Stand-In ----------
+
+
+class _Request:
+    """What the Google client returns from a resource method: call `execute()` to run it"""
+
+    def __init__(self, calendar: "FakeCalendar", run):
+        self.calendar = calendar
+        self.run = run
+
+    def execute(self):
+        self.calendar.sleep()
+        return self.run()
+
+
+def _http_error(status: int, reason: str) -> HttpError:
+    return HttpError(httplib2.Response({"status": status, "reason": reason}), reason.encode("utf-8"))
+
+
+def _parse(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class _Events:
+    def __init__(self, calendar: "FakeCalendar"):
+        self.calendar = calendar
+
+    def list(self, calendarId: str, timeMin: Optional[str] = None, timeMax: Optional[str] = None,
+             singleEvents: bool = True, orderBy: Optional[str] = None, **_):
+        def run():
+            start = _parse(timeMin) if timeMin else None
+            end = _parse(timeMax) if timeMax else None
+            items = [
+                event for event in self.calendar.stored(calendarId)
+                if (end is None or _parse(event["start"]["dateTime"]) < end)
+                and (start is None or _parse(event["end"]["dateTime"]) > start)
+            ]
+            items.sort(key=lambda event: _parse(event["start"]["dateTime"]))
+            return {"items": items}
+        return _Request(self.calendar, run)
+
+    def insert(self, calendarId: str, body: Dict, sendUpdates: Optional[str] = None, **_):
+        return _Request(self.calendar, lambda: self.calendar.insert(calendarId, body))
+
+    def get(self, calendarId: str, eventId: str, **_):
+        def run():
+            for event in self.calendar.stored(calendarId):
+                if event["id"] == eventId:
+                    return event
+            raise _http_error(404, "Not Found")
+        return _Request(self.calendar, run)
+
+
+class _FreeBusy:
+    def __init__(self, calendar: "FakeCalendar"):
+        self.calendar = calendar
+
+    def query(self, body: Dict):
+        def run():
+            start, end = _parse(body["timeMin"]), _parse(body["timeMax"])
+            calendars = {}
+            for item in body.get("items", []):
+                busy = []
+                for event in self.calendar.stored(item["id"]):
+                    event_start, event_end = _parse(event["start"]["dateTime"]), _parse(event["end"]["dateTime"])
+                    if event_start < end and event_end > start:
+                        busy.append({"start": max(event_start, start).isoformat(), "end": min(event_end, end).isoformat()})
+                calendars[item["id"]] = {"busy": busy}
+            return {"kind": "calendar#freeBusy", "calendars": calendars}
+        return _Request(self.calendar, run)
+
+
+class FakeCalendar:
+    """
+    In-memory stand-in for the Google Calendar v3 service, covering the
+    calls the scheduling flow makes: events().list/insert/get and
+    freebusy().query, each answered after a simulated network latency.
+    Inserting an event id that already exists raises the same 409 HttpError
+    Google does. Any calendar id is accepted and starts empty.
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._events: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.calls = 0
+
+    def sleep(self):
+        with self._lock:
+            self.calls += 1
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def events(self):
+        return _Events(self)
+
+    def stored(self, calendar_id: str) -> List[Dict]:
+        with self._lock:
+            return list(self._events.get(calendar_id, []))
+
+    def freebusy(self):
+        return _FreeBusy(self)
+
+    def insert(self, calendar_id: str, body: Dict) -> Dict:
+        with self._lock:
+            events = self._events.setdefault(calendar_id, [])
+            if body.get("id") and any(event["id"] == body["id"] for event in events):
+                raise _http_error(409, "The requested identifier already exists.")
+            self._next_id += 1
+            event = {**body, "id": body.get("id") or f"fake{self._next_id}"}
+            event["htmlLink"] = f"https://calendar.example/event?eid={event['id']}"
+            events.append(event)
+            return dict(event)
+
+    def seed_busy(self, calendar_ids: List[str], start: datetime, days: int,
+                  busy_fraction: float, slot_minutes: int = 30, seed: int = 0):
+        """Fill roughly `busy_fraction` of each calendar's slots with existing events"""
+        rng = random.Random(seed)
+        slot_length = timedelta(minutes=slot_minutes)
+        for calendar_id in calendar_ids:
+            slot = start
+            while slot < start + timedelta(days=days):
+                if rng.random() < busy_fraction:
+                    self.insert(calendar_id, {
+                        "summary": "Busy",
+                        "start": {"dateTime": slot.isoformat()},
+                        "end": {"dateTime": (slot + slot_length).isoformat()}
+                    })
+                slot += slot_length
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "events": sum(len(events) for events in self._events.values()),
+                "latency_ms": self.latency_ms
+            }
+
+
+class FakeCalendarClient:
+    """Drop-in for CalendarClient that hands out one shared FakeCalendar"""
+
+    def __init__(self, calendar: Optional[FakeCalendar] = None):
+        self.calendar = calendar or FakeCalendar(
+            latency_ms=float(os.getenv("FAKE_CALENDAR_LATENCY_MS", "120")),
+            jitter_ms=float(os.getenv("FAKE_CALENDAR_JITTER_MS", "40"))
+        )
+
+    def service(self) -> FakeCalendar:
+        return self.calendar
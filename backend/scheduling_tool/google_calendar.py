@@ -2,11 +2,27 @@ from pydantic import BaseModel
 from datetime import datetime, timedelta
 from google.auth import default
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import pytz
 import os
 import re
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from typing import Optional, List, Dict, Any
+from tracing import span
+from scheduling_tool.availability_cache import AvailabilityCache
+from scheduling_tool.time_phrases import build_time_phrase_index, match_time_phrase
+from scheduling_tool.session_store import create_session_store
+from scheduling_tool.reservations import create_reservation_ledger
+from scheduling_tool.booking_queue import BookingQueue, booking_key
+from scheduling_tool.slot_engine import (
+    RoundRobin, merge_intervals, open_slots, parse_business_days, parse_business_hours, window_bounds
+)
 
 class ScheduleRequest(BaseModel):
     name: str
@@ -14,8 +30,44 @@ class ScheduleRequest(BaseModel):
     datetime: str  # ISO format, e.g., "2025-07-25T15:00:00-05:00"
     phone: Optional[str] = None
     notes: Optional[str] = None
+    # Used as the Google Calendar event id, so a retried insert cannot create a second event
+    idempotency_key: Optional[str] = None
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+SUPPORT_TIMEZONE = "America/Chicago"
+
+def _calendar_list(name: str, default: str) -> List[str]:
+    ids = []
+    for calendar_id in os.getenv(name, default).split(","):
+        if calendar_id.strip() and calendar_id.strip() not in ids:
+            ids.append(calendar_id.strip())
+    return ids
+
+# One calendar per support agent (comma-separated ids); a slot is offered when
+# any agent is free and bookings are handed out round-robin
+SUPPORT_AGENT_CALENDARS = _calendar_list("SUPPORT_AGENT_CALENDARS", "primary")
+# Shared calendars (holidays, all-hands) whose busy times block every agent
+SUPPORT_CALENDAR_IDS = _calendar_list("SUPPORT_CALENDAR_IDS", "")
+
+SLOT_MINUTES = int(os.getenv("SCHEDULING_SLOT_MINUTES", "30"))
+BUSINESS_OPENS, BUSINESS_CLOSES = parse_business_hours(os.getenv("SCHEDULING_BUSINESS_HOURS", "09:00-17:00"))
+BUSINESS_DAYS = parse_business_days(os.getenv("SCHEDULING_BUSINESS_DAYS", "mon,tue,wed,thu,fri,sat,sun"))
+HORIZON_DAYS = int(os.getenv("SCHEDULING_HORIZON_DAYS", "7"))
+
+# The free/busy API accepts at most this many calendars per request
+FREEBUSY_MAX_CALENDARS = 50
+
+agent_rotation = RoundRobin(SUPPORT_AGENT_CALENDARS)
+
+# When the calendar cannot be reached, offer made-up times instead of an error
+CALENDAR_MOCK_FALLBACK = os.getenv("CALENDAR_MOCK_FALLBACK", "true").lower() == "true"
+
+# Open slots are served from memory for a short while; bookings made through
+# schedule_support_event remove their slot right away
+availability_cache = AvailabilityCache(
+    ttl_seconds=float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "60")),
+    slot_minutes=SLOT_MINUTES
+)
 
 def get_oauth_credentials():
     required_vars = ["GOOGLE_REFRESH_TOKEN", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"]
@@ -34,18 +86,97 @@ def get_oauth_credentials():
     )
     return creds
 
+# Refresh the access token this long before it expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+class CalendarClient:
+    """
+    Process-wide Google Calendar access. Credentials are created once and
+    their access token is refreshed only when it is missing or close to
+    expiry (under a lock, so concurrent requests never refresh twice).
+    The service object is built from the bundled discovery document and
+    kept per thread, because its HTTP transport is not thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._local = threading.local()
+
+    def _fresh_credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = get_oauth_credentials()
+            creds = self._credentials
+            # `expiry` is naive UTC, as google-auth stores it
+            if not creds.token or not creds.expiry or creds.expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN:
+                try:
+                    creds.refresh(GoogleAuthRequest())
+                except Exception:
+                    # Rebuild them from the environment on the next call
+                    # (e.g. after the refresh token was rotated)
+                    self._credentials = None
+                    raise
+            return creds
+
+    def service(self):
+        creds = self._fresh_credentials()
+        service = getattr(self._local, "service", None)
+        if service is None or self._local.credentials is not creds:
+            service = build("calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+            self._local.service = service
+            self._local.credentials = creds
+        return service
+
+# "fake" swaps Google for an in-memory calendar (no credentials, simulated
+# latency) for local development and load testing
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", "google").lower()
+
+if CALENDAR_BACKEND == "fake":
+    from scheduling_tool.fake_calendar import FakeCalendarClient
+    print(f"📅 Using the offline fake calendar backend")
+    calendar_client = FakeCalendarClient()
+else:
+    calendar_client = CalendarClient()
+
+def _free_agents_at(service, start_time: datetime, end_time: datetime) -> List[str]:
+    """Agents free for [start_time, end_time) according to one free/busy call"""
+    busy = _query_busy(service, SUPPORT_AGENT_CALENDARS + SUPPORT_CALENDAR_IDS, start_time, end_time)
+
+    def overlaps(calendar_id: str) -> bool:
+        return any(start < end_time and end > start_time for start, end in busy[calendar_id])
+
+    if any(overlaps(calendar_id) for calendar_id in SUPPORT_CALENDAR_IDS):
+        return []
+    return [agent for agent in SUPPORT_AGENT_CALENDARS if not overlaps(agent)]
+
 def schedule_support_event(req: ScheduleRequest):
     try:
         # Parse and prepare time data
         start_time = datetime.fromisoformat(req.datetime)
-        end_time = start_time + timedelta(minutes=30)
+        end_time = start_time + timedelta(minutes=SLOT_MINUTES)
 
         # Use OAuth2 credentials from environment
-        credentials = get_oauth_credentials()
-        service = build("calendar", "v3", credentials=credentials)
+        with span("calendar.client"):
+            service = calendar_client.service()
 
-        # Use primary calendar (or your shared calendar's email if needed)
-        calendar_id = "primary"
+        # A retry goes back to the calendar the first attempt with this key
+        # picked: its insert may have gone through without an answer, and
+        # the event id only deduplicates within one calendar
+        calendar_id = _booking_calendar(req.idempotency_key)
+        claimed = False
+        if calendar_id is None:
+            # Book on the next free agent's calendar in rotation. The cache
+            # claims the agent atomically, so concurrent bookings of one slot
+            # never share an agent
+            try:
+                calendar_id = availability_cache.claim(start_time.isoformat(), agent_rotation.pick)
+                claimed = calendar_id is not None
+            except LookupError:
+                calendar_id = agent_rotation.pick(_free_agents_at(service, start_time, end_time))
+            if calendar_id is None:
+                return {"error": "Failed to schedule call.", "details": "No support agent is free at that time."}
+            _remember_booking_calendar(req.idempotency_key, calendar_id)
 
         # Prepare details for description
         desc = f"Scheduled via the AI assistant.\nName: {req.name}\nEmail: {req.email}"
@@ -59,86 +190,129 @@ def schedule_support_event(req: ScheduleRequest):
             "description": desc,
             "start": {
                 "dateTime": start_time.isoformat(),
-                "timeZone": "America/Chicago",
+                "timeZone": SUPPORT_TIMEZONE,
             },
             "end": {
                 "dateTime": end_time.isoformat(),
-                "timeZone": "America/Chicago",
+                "timeZone": SUPPORT_TIMEZONE,
             },
             "attendees": [{"email": req.email, "displayName": req.name}],
             "reminders": {"useDefault": True},
         }
+        if req.idempotency_key:
+            event["id"] = req.idempotency_key
 
-        created_event = service.events().insert(
-            calendarId=calendar_id,
-            body=event,
-            sendUpdates="all"
-        ).execute()
+        try:
+            with span("calendar.insert"):
+                try:
+                    created_event = service.events().insert(
+                        calendarId=calendar_id,
+                        body=event,
+                        sendUpdates="all"
+                    ).execute()
+                except HttpError as e:
+                    if not (req.idempotency_key and e.resp.status == 409):
+                        raise
+                    # An earlier attempt with this key already created the event
+                    print(f"📅 Booking {req.idempotency_key} already exists, not inserting again")
+                    created_event = service.events().get(calendarId=calendar_id, eventId=req.idempotency_key).execute()
+        except HttpError as e:
+            if e.resp.status < 500:
+                # Rejected outright, so no event exists and the agent is still
+                # free: offer them again, and let a retry pick afresh. After a
+                # timeout or server error the event may exist, so they stay
+                # busy until the cache reloads
+                _forget_booking_calendar(req.idempotency_key)
+                if claimed:
+                    availability_cache.release(start_time.isoformat(), calendar_id)
+            raise
+        if not claimed:
+            availability_cache.mark_busy(start_time, end_time, agent=calendar_id)
 
         return {
             "message": "✅ Call scheduled!",
-            "event_link": created_event.get("htmlLink")
+            "event_link": created_event.get("htmlLink"),
+            "agent": calendar_id
         }
 
     except Exception as e:
         print(f"[ERROR] {e}")
         return {"error": "Failed to schedule call.", "details": str(e)}
 
-def get_available_times():
-    try:
-        print(f"📅 Getting available times...")
-        # Set timezone and time window
-        tz = pytz.timezone("America/Chicago")
-        now = datetime.now(tz)
-        start_of_day = now.replace(hour=9, minute=0, second=0, microsecond=0)
-        end_of_day = now.replace(hour=17, minute=0, second=0, microsecond=0)
-        days = 7
-        slot_minutes = 30
-        available_slots = []
+def _booking_calendar(key: Optional[str]) -> Optional[str]:
+    """The agent calendar an earlier attempt with idempotency key `key` booked on"""
+    record = session_store.get(f"booking:{key}") if key else None
+    return record["calendar_id"] if record else None
 
-        print(f"📅 Checking credentials...")
-        # Use OAuth2 credentials from environment
-        credentials = get_oauth_credentials()
+def _remember_booking_calendar(key: Optional[str], calendar_id: str):
+    # Kept in the session store, which several workers share when it is on
+    # SQLite, so a retry that lands on another worker finds it too
+    if key:
+        session_store.put(f"booking:{key}", {"calendar_id": calendar_id})
+
+def _forget_booking_calendar(key: Optional[str]):
+    if key:
+        session_store.delete(f"booking:{key}")
+
+def _query_busy(service, calendar_ids: List[str], time_min: datetime, time_max: datetime) -> Dict[str, List[tuple]]:
+    """
+    Merged busy intervals per calendar in [time_min, time_max), from one
+    free/busy call per FREEBUSY_MAX_CALENDARS calendars.
+    """
+    busy = {}
+    for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+        chunk = calendar_ids[i:i + FREEBUSY_MAX_CALENDARS]
+        with span("calendar.freebusy", calendars=len(chunk)):
+            result = service.freebusy().query(body={
+                "timeMin": time_min.isoformat(),
+                "timeMax": time_max.isoformat(),
+                "timeZone": SUPPORT_TIMEZONE,
+                "items": [{"id": calendar_id} for calendar_id in chunk]
+            }).execute()
+
+        for calendar_id in chunk:
+            calendar = result.get("calendars", {}).get(calendar_id, {})
+            if calendar.get("errors"):
+                # Unknown busy times must not be offered as free
+                raise RuntimeError(f"Free/busy lookup failed for {calendar_id}: {calendar['errors']}")
+            busy[calendar_id] = merge_intervals(
+                (datetime.fromisoformat(period["start"]), datetime.fromisoformat(period["end"]))
+                for period in calendar.get("busy", [])
+            )
+    return busy
+
+def _fetch_available_times() -> List[tuple]:
+    """Open slots over the scheduling horizon, with the agents free at each, straight from Google Calendar"""
+    print(f"📅 Getting available times...")
+    tz = pytz.timezone(SUPPORT_TIMEZONE)
+    now = datetime.now(tz)
+
+    print(f"📅 Checking credentials...")
+    # Use OAuth2 credentials from environment
+    with span("calendar.client"):
+        service = calendar_client.service()
         print(f"📅 Credentials obtained successfully")
-        service = build("calendar", "v3", credentials=credentials)
-        calendar_id = "primary"
-
-        for day in range(days):
-            day_start = (start_of_day + timedelta(days=day))
-            day_end = (end_of_day + timedelta(days=day))
-            # Get events for this day
-            events_result = service.events().list(
-                calendarId=calendar_id,
-                timeMin=day_start.isoformat(),
-                timeMax=day_end.isoformat(),
-                singleEvents=True,
-                orderBy="startTime"
-            ).execute()
-            events = events_result.get("items", [])
-            # Build a list of busy slots
-            busy = []
-            for event in events:
-                start = event["start"].get("dateTime")
-                end = event["end"].get("dateTime")
-                if start and end:
-                    busy.append((datetime.fromisoformat(start), datetime.fromisoformat(end)))
-            # Generate all possible slots for the day
-            slot = day_start
-            while slot + timedelta(minutes=slot_minutes) <= day_end:
-                slot_end = slot + timedelta(minutes=slot_minutes)
-                # Check if slot overlaps with any busy period
-                overlap = any(
-                    (slot < b_end and slot_end > b_start)
-                    for b_start, b_end in busy
-                )
-                if not overlap and slot > now:
-                    available_slots.append(slot.isoformat())
-                slot += timedelta(minutes=slot_minutes)
-        
-        print(f"📅 Found {len(available_slots)} available slots")
-        return {"available_times": available_slots}
+
+    # One free/busy round trip for every agent and shared calendar over the
+    # whole window, instead of one events().list call per day
+    window_start, window_end = window_bounds(tz, now, HORIZON_DAYS, BUSINESS_OPENS, BUSINESS_CLOSES)
+    busy = _query_busy(service, SUPPORT_AGENT_CALENDARS + SUPPORT_CALENDAR_IDS, window_start, window_end)
+    blocked = [interval for calendar_id in SUPPORT_CALENDAR_IDS for interval in busy[calendar_id]]
+
+    slots = open_slots(
+        {agent: busy[agent] for agent in SUPPORT_AGENT_CALENDARS}, blocked, tz, now,
+        HORIZON_DAYS, BUSINESS_OPENS, BUSINESS_CLOSES, BUSINESS_DAYS, SLOT_MINUTES
+    )
+    print(f"📅 Found {len(slots)} available slots across {len(SUPPORT_AGENT_CALENDARS)} agent calendar(s)")
+    return [(slot.isoformat(), agents) for slot, agents in slots]
+
+def get_available_times():
+    try:
+        return {"available_times": availability_cache.get_or_load(_fetch_available_times)}
     except Exception as e:
         print(f"[ERROR] get_available_times: {e}")
+        if not CALENDAR_MOCK_FALLBACK:
+            return {"error": "Calendar unavailable.", "details": str(e)}
         # Fallback: provide mock available times for testing
         print(f"📅 Using fallback mock times")
         tz = pytz.timezone("America/Chicago")
@@ -159,20 +333,234 @@ def get_available_times():
 #  Voice Scheduling Flow Functions
 # ------------------------------------------------------------------
 
-def start_scheduling_flow() -> Dict[str, Any]:
+# Fixed prompts spoken by the flow (pre-synthesized by the voice TTS cache)
+SCHEDULE_OFFER_MESSAGE = "Would you like me to help you schedule a call with Aven's support team?"
+OFFER_REPROMPT_MESSAGE = "I didn't catch that. Would you like me to help you schedule a call with Aven's support team? Please say yes or no."
+OFFER_DECLINED_MESSAGE = "No problem! If you change your mind, just let me know. Is there anything else I can help you with?"
+CALENDAR_UNAVAILABLE_MESSAGE = "I'd love to help you schedule a call, but our calendar system isn't available right now. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call."
+NO_TIMES_MESSAGE = "I don't see any available times in the next week. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call."
+CALENDAR_ERROR_MESSAGE = "Sorry, I'm having trouble accessing the calendar. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call."
+TIME_REPROMPT_MESSAGE = "I didn't catch which time you prefer. Could you say it again? For example, 'Monday at 2 PM' or 'Tuesday, March 5th at 10 AM'."
+CONTACT_PROMPT_MESSAGE = "I need your contact information. Please tell me your full name, email address, and phone number."
+EDIT_CONTACT_MESSAGE = "I can help you edit your contact information. Please tell me your correct full name, email address, and phone number."
+CONFIRM_REPROMPT_MESSAGE = "I didn't catch that. Should I go ahead and schedule this call? Please say yes, no, or provide your correct contact information if needed."
+CONFIRM_DECLINED_MESSAGE = "No problem! If you'd like to schedule a call later, just let me know. Is there anything else I can help you with?"
+BOOKED_MESSAGE = "Excellent! Your support call has been scheduled and you'll receive a confirmation email shortly. Is there anything else I can help you with?"
+SLOT_TAKEN_MESSAGE = "Sorry, there was an error booking your appointment. That time slot may no longer be available."
+SLOT_HOLD_LOST_MESSAGE = "Sorry, I couldn't keep that time for you any longer and it has been taken."
+BOOKING_ERROR_MESSAGE = "Sorry, there was an error booking your appointment. Please try again or contact support directly."
+BOOKING_PENDING_MESSAGE = "Great! I'm booking your support call now and you'll receive a confirmation email shortly. Is there anything else I can help you with?"
+BOOKING_STILL_PENDING_MESSAGE = "I'm still booking your support call. You'll receive a confirmation email as soon as it's done. Is there anything else I can help you with?"
+UNKNOWN_STAGE_MESSAGE = "I'm not sure where we are in the scheduling process. Let's start over."
+FLOW_ERROR_MESSAGE = "Sorry, there was an error. Let's try again."
+SESSION_EXPIRED_MESSAGE = "Sorry, I lost track of our scheduling conversation. Would you like me to help you schedule a call with Aven's support team?"
+SLOT_HELD_MESSAGE = "Sorry, someone else just picked that time. Please choose one of the other times I mentioned."
+
+CANNED_MESSAGES = [
+    SCHEDULE_OFFER_MESSAGE,
+    OFFER_REPROMPT_MESSAGE,
+    OFFER_DECLINED_MESSAGE,
+    CALENDAR_UNAVAILABLE_MESSAGE,
+    NO_TIMES_MESSAGE,
+    CALENDAR_ERROR_MESSAGE,
+    TIME_REPROMPT_MESSAGE,
+    CONTACT_PROMPT_MESSAGE,
+    EDIT_CONTACT_MESSAGE,
+    CONFIRM_REPROMPT_MESSAGE,
+    CONFIRM_DECLINED_MESSAGE,
+    BOOKED_MESSAGE,
+    SLOT_TAKEN_MESSAGE,
+    BOOKING_ERROR_MESSAGE,
+    BOOKING_PENDING_MESSAGE,
+    BOOKING_STILL_PENDING_MESSAGE,
+    UNKNOWN_STAGE_MESSAGE,
+    FLOW_ERROR_MESSAGE,
+    SESSION_EXPIRED_MESSAGE,
+    SLOT_HELD_MESSAGE,
+    SLOT_HOLD_LOST_MESSAGE,
+]
+
+# ---------- Availability Prefetch ----------
+
+# Availability is fetched in the background as soon as the offer is made,
+# so the "yes" turn does not wait on Google Calendar
+AVAILABILITY_PREFETCH_ENABLED = os.getenv("AVAILABILITY_PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_TTL_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_TTL_SECONDS", "300"))
+PREFETCH_MAX_SESSIONS = 1000
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="calendar-prefetch")
+_prefetches: "OrderedDict[str, tuple]" = OrderedDict()  # session_id -> (future, started_at)
+_prefetch_lock = threading.Lock()
+
+def _start_prefetch(session_id: str):
+    future = _prefetch_pool.submit(get_available_times)
+    now = time.time()
+    with _prefetch_lock:
+        _prefetches[session_id] = (future, now)
+        # Oldest first: drop abandoned offers
+        while _prefetches:
+            oldest_id, (oldest, started_at) = next(iter(_prefetches.items()))
+            if len(_prefetches) <= PREFETCH_MAX_SESSIONS and now - started_at < PREFETCH_TTL_SECONDS:
+                break
+            del _prefetches[oldest_id]
+            oldest.cancel()
+
+def _take_prefetch(session_id: Optional[str]):
+    """The session's prefetch future (removed from the registry), or None"""
+    if not session_id:
+        return None
+    with _prefetch_lock:
+        entry = _prefetches.pop(session_id, None)
+    if entry is None or time.time() - entry[1] >= PREFETCH_TTL_SECONDS:
+        return None
+    return entry[0]
+
+def _prefetched_available_times(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Availability fetched when the offer was made (waits if still in flight)"""
+    future = _take_prefetch(session_id)
+    if future is None or future.cancelled():
+        return None
+    with span("calendar.prefetch_wait", done=future.done()):
+        result = future.result()
+    # The shared cache has seen any bookings since; prefer it while it is live
+    cached = availability_cache.get()
+    return {"available_times": cached} if cached is not None else result
+
+# ---------- Server-Side Session State ----------
+
+# The full flow state (offered times, chosen slot, contact details) stays on
+# the server; clients only carry {"active", "session_id", "stage"}
+session_store = create_session_store()
+
+def _new_session_id() -> str:
+    # Unguessable: the id is the only thing standing between a client and
+    # another user's contact details
+    return secrets.token_urlsafe(16)
+
+def _load_session(wire_state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Full flow state for a client's schedule_state (None if it has expired).
+    Only the session id is trusted: any other flow state the client sends
+    (offered times, a chosen time that was never held) is ignored.
+    """
+    session_id = wire_state.get("session_id")
+    stored = session_store.get(session_id) if session_id else None
+    if stored is not None:
+        return stored
+    if wire_state.get("stage", "offering_schedule") == "offering_schedule":
+        # Nothing is stored until the offer is answered
+        return {"active": True, "stage": "offering_schedule", "session_id": session_id or _new_session_id()}
+    return None
+
+def _save_session(session_id: str, result: Dict[str, Any], chosen_time: Optional[str] = None) -> Dict[str, Any]:
+    """Store the flow's new state and hand the client only its compact form"""
+    state = result.get("schedule_state")
+    if result.get("booking"):
+        # The client is done with the session, but a retried confirmation
+        # resends its state: remember the booking so it is reported instead
+        # of starting over
+        session_store.put(session_id, {
+            "session_id": session_id,
+            "stage": "booked",
+            "booking_key": result["booking"]["key"],
+            "chosen_time": chosen_time
+        })
+        return result
+    if not state or result.get("done"):
+        session_store.delete(session_id)
+        return result
+    session_id = state.get("session_id") or session_id
+    state["session_id"] = session_id
+    session_store.put(session_id, state)
+    result["schedule_state"] = {"active": True, "session_id": session_id, "stage": state.get("stage")}
+    return result
+
+# ---------- Slot Holds ----------
+
+# A slot picked in _handle_time_selection is held for that session until it
+# is booked, declined or the hold expires; other sessions are not offered it
+# once every free agent at that time is held
+reservation_ledger = create_reservation_ledger()
+
+def _slot_capacity(slot: str) -> int:
+    """How many sessions may hold `slot`: its free agents, or 1 when the cache cannot tell"""
+    free = availability_cache.free_agents(slot)
+    return len(free) if free is not None else 1
+
+def _unheld_times(available_times: List[str], session_id: Optional[str]) -> List[str]:
+    """`available_times` minus the slots other sessions' holds have filled"""
+    held = reservation_ledger.held_counts(exclude_session=session_id)
+    if not held:
+        return available_times
+    return [slot for slot in available_times if held.get(slot, 0) < _slot_capacity(slot)]
+
+# ---------- Background Booking ----------
+
+# The calendar insert runs on the booking queue; the confirmation turn waits
+# at most this long for it (by default not at all, keeping the calendar pool
+# free) before acknowledging with the booking still pending
+BOOKING_ACK_WAIT_SECONDS = float(os.getenv("BOOKING_ACK_WAIT_SECONDS", "0"))
+
+def _share_booking_status(job: Dict[str, Any]):
+    # Jobs live on the worker that queued them; the session store is shared
+    # by every worker when it is on SQLite, so any of them can report it
+    session_store.put(f"booking-status:{job['key']}", job)
+
+booking_queue = BookingQueue(
+    schedule_support_event,
+    workers=int(os.getenv("BOOKING_WORKERS", "4")),
+    ttl_seconds=float(os.getenv("BOOKING_STATUS_TTL_SECONDS", "3600")),
+    publish=_share_booking_status
+)
+
+def get_booking_status(key: str) -> Dict[str, Any]:
+    status = booking_queue.status(key) or session_store.get(f"booking-status:{key}")
+    return status if status is not None else {"error": "Unknown booking.", "key": key}
+
+def booking_followup(key: str) -> Dict[str, Any]:
+    """
+    Reply to a caller asking (see asks_about_booking) how booking `key` went,
+    after its scheduling session ended: offers other times if it failed.
+    """
+    session_id = _new_session_id()
+    result = _report_booking({"session_id": session_id, "booking_key": key})
+    if result.get("booking"):
+        return result
+    return _save_session(session_id, result)
+
+def start_scheduling_flow(prefetch: bool = True, message: str = SCHEDULE_OFFER_MESSAGE) -> Dict[str, Any]:
     """Start the voice scheduling flow by first asking if user wants to schedule"""
+    session_id = _new_session_id()
+    if prefetch and AVAILABILITY_PREFETCH_ENABLED:
+        _start_prefetch(session_id)
     return {
-        "message": "Would you like me to help you schedule a call with Aven's support team?",
+        "message": message,
         "stage": "offering_schedule",
         "done": False,
         "schedule_state": {
             "active": True,
-            "stage": "offering_schedule"
+            "stage": "offering_schedule",
+            "session_id": session_id
         }
     }
 
-def continue_scheduling_flow(user_text: str, state: Dict[str, Any]) -> Dict[str, Any]:
-    """Continue the voice scheduling flow based on current stage"""
+def continue_scheduling_flow(user_text: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Continue the voice scheduling flow based on current stage. Returns None
+    when the session already ended with a booking and the turn is not about
+    it: the caller answers it like any other question.
+    """
+    with span(f"scheduling.{state.get('stage', 'offering_schedule')}"):
+        full_state = _load_session(state)
+        if full_state is None:
+            print(f"📅 Scheduling session expired, offering again")
+            return start_scheduling_flow(message=SESSION_EXPIRED_MESSAGE)
+        result = _continue_scheduling_flow(user_text, full_state)
+        if result is None:
+            return None
+        return _save_session(full_state["session_id"], result, full_state.get("chosen_time"))
+
+def _continue_scheduling_flow(user_text: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     try:
         stage = state.get("stage", "offering_schedule")
         print(f"🔄 Scheduling flow - stage: {stage}, user_text: '{user_text}', state: {state}")
@@ -197,10 +585,12 @@ def continue_scheduling_flow(user_text: str, state: Dict[str, Any]) -> Dict[str,
             result = _handle_confirmation(user_text, state)
             print(f"✅ Confirmation result: {result}")
             return result
+        elif stage == "booked":
+            return _handle_booking_status(user_text, state)
         else:
             print(f"❓ Unknown stage: {stage}")
             return {
-                "message": "I'm not sure where we are in the scheduling process. Let's start over.",
+                "message": UNKNOWN_STAGE_MESSAGE,
                 "stage": "error",
                 "done": True,
                 "error": "Unknown stage"
@@ -208,7 +598,7 @@ def continue_scheduling_flow(user_text: str, state: Dict[str, Any]) -> Dict[str,
     except Exception as e:
         print(f"[ERROR] continue_scheduling_flow: {e}")
         return {
-            "message": "Sorry, there was an error. Let's try again.",
+            "message": FLOW_ERROR_MESSAGE,
             "stage": "error", 
             "done": True,
             "error": str(e)
@@ -223,41 +613,34 @@ def _handle_schedule_offer(user_text: str, state: Dict[str, Any]) -> Dict[str, A
         # User wants to schedule, get available times
         try:
             print(f"📋 Getting available times...")
-            times_result = get_available_times()
+            times_result = _prefetched_available_times(state.get("session_id")) or get_available_times()
             print(f"📋 Times result: {times_result}")
             
             if "error" in times_result:
                 print(f"📋 Calendar error: {times_result['error']}")
                 return {
-                    "message": "I'd love to help you schedule a call, but our calendar system isn't available right now. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call.",
+                    "message": CALENDAR_UNAVAILABLE_MESSAGE,
                     "stage": "error",
                     "done": True,
                     "error": times_result["error"]
                 }
             
-            available_times = times_result.get("available_times", [])[:5]  # Show first 5 slots
+            # Show first 5 slots nobody else is holding
+            available_times = _unheld_times(times_result.get("available_times", []), state.get("session_id"))[:5]
             print(f"📋 Available times: {available_times}")
             
             if not available_times:
                 print(f"📋 No available times found")
                 return {
-                    "message": "I don't see any available times in the next week. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call.",
+                    "message": NO_TIMES_MESSAGE,
                     "stage": "error", 
                     "done": True,
                     "error": "No available times"
                 }
             
-            # Format times for speech
-            formatted_times = []
-            for time_str in available_times:
-                dt = datetime.fromisoformat(time_str)
-                formatted = dt.strftime("%A, %B %d at %I:%M %p")
-                formatted_times.append(formatted)
-            
-            bullets = "\n".join(f"- {t}" for t in formatted_times)
             msg = (
                 "I can schedule a support call with Aven's team. Here are some available times:\n\n"
-                f"{bullets}\n\n"
+                f"{_format_time_list(available_times)}\n\n"
                 "Please tell me which time works best for you."
             )
             
@@ -265,6 +648,7 @@ def _handle_schedule_offer(user_text: str, state: Dict[str, Any]) -> Dict[str, A
             new_state = state.copy()
             new_state["stage"] = "awaiting_time"
             new_state["available_times"] = available_times
+            new_state["time_phrases"] = build_time_phrase_index(available_times)
             
             print(f"📋 Moving to awaiting_time stage with state: {new_state}")
             
@@ -277,40 +661,65 @@ def _handle_schedule_offer(user_text: str, state: Dict[str, Any]) -> Dict[str, A
         except Exception as e:
             print(f"[ERROR] getting available times: {e}")
             return {
-                "message": "Sorry, I'm having trouble accessing the calendar. Please contact Aven support directly at support@aven.com or visit aven.com/contact to schedule your call.",
+                "message": CALENDAR_ERROR_MESSAGE,
                 "stage": "error",
                 "done": True,
                 "error": str(e)
             }
     elif _is_no_response(user_text):
+        future = _take_prefetch(state.get("session_id"))
+        if future is not None:
+            future.cancel()
         return {
-            "message": "No problem! If you change your mind, just let me know. Is there anything else I can help you with?",
+            "message": OFFER_DECLINED_MESSAGE,
             "stage": "cancelled",
             "done": True,
             "schedule_state": None
         }
     else:
         return {
-            "message": "I didn't catch that. Would you like me to help you schedule a call with Aven's support team? Please say yes or no.",
+            "message": OFFER_REPROMPT_MESSAGE,
             "stage": "offering_schedule",
             "done": False,
             "schedule_state": state
         }
 
+def _format_time_list(available_times: List[str]) -> str:
+    """Offered slots as a bulleted list for speech"""
+    return "\n".join(
+        f"- {datetime.fromisoformat(time_str).strftime('%A, %B %d at %I:%M %p')}" for time_str in available_times
+    )
+
 def _handle_time_selection(user_text: str, state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle time selection stage of voice scheduling"""
     available_times = state.get("available_times", [])
-    chosen_time = _match_time_from_speech(user_text, available_times)
+    chosen_time = _match_time_from_speech(user_text, available_times, state.get("time_phrases"))
     
     if not chosen_time:
         # Try to be more helpful with time parsing
         return {
-            "message": "I didn't catch which time you prefer. Could you say it again? For example, 'Monday at 2 PM' or 'Tuesday, March 5th at 10 AM'.",
+            "message": TIME_REPROMPT_MESSAGE,
             "stage": "awaiting_time",
             "done": False,
             "schedule_state": state
         }
     
+    # Hold the slot so concurrent sessions cannot pick it too
+    if not reservation_ledger.hold(chosen_time, state["session_id"], _slot_capacity(chosen_time)):
+        # Drop everything offered that others have filled since, not just this slot
+        remaining = [slot for slot in _unheld_times(available_times, state["session_id"]) if slot != chosen_time]
+        if remaining:
+            state["available_times"] = remaining
+            state["time_phrases"] = build_time_phrase_index(remaining)
+            return {
+                "message": SLOT_HELD_MESSAGE,
+                "stage": "awaiting_time",
+                "done": False,
+                "schedule_state": state
+            }
+        # Everything offered has been taken meanwhile: offer fresh times
+        return _offer_other_times(state, chosen_time, "Sorry, those times were just taken.")
+
     # Store chosen time and move to contact info
     state["chosen_time"] = chosen_time
     state["stage"] = "awaiting_contact"
@@ -356,7 +765,7 @@ def _handle_contact_info(user_text: str, state: Dict[str, Any]) -> Dict[str, Any
         if len(missing) == 3:
             # Nothing provided yet
             return {
-                "message": "I need your contact information. Please tell me your full name, email address, and phone number.",
+                "message": CONTACT_PROMPT_MESSAGE,
                 "stage": "awaiting_contact",
                 "done": False,
                 "schedule_state": state
@@ -409,7 +818,7 @@ def _handle_confirmation(user_text: str, state: Dict[str, Any]) -> Dict[str, Any
     # Check if user wants to edit contact info explicitly
     if any(word in user_lower for word in ["edit", "change", "wrong", "incorrect", "fix", "update"]):
         return {
-            "message": "I can help you edit your contact information. Please tell me your correct full name, email address, and phone number.",
+            "message": EDIT_CONTACT_MESSAGE,
             "stage": "awaiting_contact",
             "done": False,
             "schedule_state": state
@@ -440,47 +849,49 @@ def _handle_confirmation(user_text: str, state: Dict[str, Any]) -> Dict[str, Any
     if _is_yes_response(user_text):
         # Book the appointment
         try:
+            session_id = state["session_id"]
+            key = booking_key(session_id, state["chosen_time"])
             schedule_req = ScheduleRequest(
                 name=state["name"],
                 email=state["email"],
                 datetime=state["chosen_time"],
                 phone=state.get("phone", ""),
-                notes="Scheduled via voice assistant"
+                notes="Scheduled via voice assistant",
+                idempotency_key=key
             )
-            
-            result = schedule_support_event(schedule_req)
-            
-            if "error" in result:
-                return {
-                    "message": "Sorry, there was an error booking your appointment. That time slot may no longer be available. Please try selecting a different time.",
-                    "stage": "awaiting_time",
-                    "done": False,
-                    "schedule_state": {
-                        "active": True,
-                        "stage": "awaiting_time",
-                        "available_times": state.get("available_times", [])
-                    }
-                }
-            
-            return {
-                "message": "Excellent! Your support call has been scheduled and you'll receive a confirmation email shortly. Is there anything else I can help you with?",
-                "stage": "done",
-                "done": True,
-                "schedule_state": None
-            }
+
+            # The hold can expire while the caller gives their details: renew
+            # it, unless other sessions have filled the slot in the meantime
+            if not reservation_ledger.hold(state["chosen_time"], session_id, _slot_capacity(state["chosen_time"])):
+                return _offer_other_times(state, state["chosen_time"], SLOT_HOLD_LOST_MESSAGE)
+
+            # Known to be gone already: no need to queue the insert
+            if availability_cache.free_agents(state["chosen_time"]) == []:
+                reservation_ledger.release(session_id)
+                return _slot_taken(state)
+
+            # The hold is kept until the insert finishes, then the calendar
+            # is the source of truth
+            booking_queue.submit(key, schedule_req, on_done=lambda result: reservation_ledger.release(session_id))
+            job = booking_queue.wait(key, BOOKING_ACK_WAIT_SECONDS)
+
+            if job["status"] == "failed":
+                return _slot_taken(state)
+            return _booking_result(job)
             
         except Exception as e:
             print(f"[ERROR] booking appointment: {e}")
             return {
-                "message": "Sorry, there was an error booking your appointment. Please try again or contact support directly.",
+                "message": BOOKING_ERROR_MESSAGE,
                 "stage": "error",
                 "done": True,
                 "error": str(e)
             }
     
     elif _is_no_response(user_text):
+        reservation_ledger.release(state["session_id"])
         return {
-            "message": "No problem! If you'd like to schedule a call later, just let me know. Is there anything else I can help you with?",
+            "message": CONFIRM_DECLINED_MESSAGE,
             "stage": "cancelled",
             "done": True,
             "schedule_state": None
@@ -488,121 +899,102 @@ def _handle_confirmation(user_text: str, state: Dict[str, Any]) -> Dict[str, Any
     
     else:
         return {
-            "message": "I didn't catch that. Should I go ahead and schedule this call? Please say yes, no, or provide your correct contact information if needed.",
+            "message": CONFIRM_REPROMPT_MESSAGE,
             "stage": "confirming",
             "done": False,
             "schedule_state": state
         }
 
+def _offer_other_times(state: Dict[str, Any], taken: str, apology: str) -> Dict[str, Any]:
+    """Back to picking a time from fresh availability, without the `taken` slot"""
+    times_result = get_available_times()
+    remaining = [
+        slot for slot in _unheld_times(times_result.get("available_times", []), state.get("session_id"))
+        if slot != taken
+    ][:5]
+    if not remaining:
+        return {
+            "message": NO_TIMES_MESSAGE,
+            "stage": "error",
+            "done": True,
+            "error": "No available times"
+        }
+    return {
+        "message": f"{apology} Here are some other available times:\n\n{_format_time_list(remaining)}\n\nPlease tell me which time works best for you.",
+        "stage": "awaiting_time",
+        "done": False,
+        "schedule_state": {
+            "active": True,
+            "stage": "awaiting_time",
+            "session_id": state.get("session_id"),
+            "available_times": remaining,
+            "time_phrases": build_time_phrase_index(remaining)
+        }
+    }
+
+def _slot_taken(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Back to picking a time after the chosen slot could not be booked"""
+    return _offer_other_times(state, state["chosen_time"], SLOT_TAKEN_MESSAGE)
+
+def _booking_result(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Acknowledge a submitted booking. The session ends even while the insert
+    is still pending; the caller hears how it went if they ask about it
+    (see booking_followup).
+    """
+    return {
+        "message": BOOKED_MESSAGE if job["status"] == "booked" else BOOKING_PENDING_MESSAGE,
+        "stage": "done",
+        "done": True,
+        "schedule_state": None,
+        "booking": job
+    }
+
+def _report_booking(state: Dict[str, Any]) -> Dict[str, Any]:
+    """How the booking in `state["booking_key"]` went, as the reply to the caller asking"""
+    job = get_booking_status(state["booking_key"])
+    if job.get("status") == "failed":
+        return _offer_other_times(state, state.get("chosen_time"), SLOT_TAKEN_MESSAGE)
+    if job.get("status") == "booked":
+        message = BOOKED_MESSAGE
+    elif job.get("status") == "pending":
+        message = BOOKING_STILL_PENDING_MESSAGE
+    else:
+        message = BOOKING_ERROR_MESSAGE
+    return {
+        "message": message,
+        "stage": "done",
+        "done": True,
+        "schedule_state": None,
+        "booking": job
+    }
+
+def _handle_booking_status(user_text: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    A turn sent with the state of a session that ended with a booking: a
+    retried confirmation or a question about the booking gets its status,
+    anything else is not for the scheduling flow (None).
+    """
+    if not (_is_yes_response(user_text) or asks_about_booking(user_text)):
+        return None
+    return _report_booking(state)
+
 # ------------------------------------------------------------------
 #  Helper Functions for Voice Parsing
 # ------------------------------------------------------------------
 
-def _match_time_from_speech(user_text: str, available_times: List[str]) -> Optional[str]:
-    """Try to match spoken time to available slots with improved flexibility"""
-    user_lower = user_text.lower()
-    print(f"🔍 Time matching - user text: '{user_text}', available times: {available_times}")
-    
-    # For each available time, try to match against user speech
-    for time_str in available_times:
-        dt = datetime.fromisoformat(time_str)
-        
-        # Check various formats the user might say
-        formats_to_check = [
-            dt.strftime("%A").lower(),  # "monday"
-            dt.strftime("%A, %B %d").lower(),  # "monday, march 5"
-            dt.strftime("%B %d").lower(),  # "march 5"
-            dt.strftime("%B %dth").lower(),  # "march 5th"
-            dt.strftime("%B %dst").lower(),  # "march 1st"
-            dt.strftime("%B %dnd").lower(),  # "march 2nd"
-            dt.strftime("%B %drd").lower(),  # "march 3rd"
-            dt.strftime("%I %p").lower().replace(" ", ""),  # "2pm"
-            dt.strftime("%I:%M %p").lower().replace(" ", ""),  # "2:30pm"
-            dt.strftime("%A at %I %p").lower(),  # "monday at 2 pm"
-            dt.strftime("%A at %I:%M %p").lower(),  # "monday at 2:30 pm"
-            dt.strftime("%A, %B %d at %I %p").lower(),  # "monday, march 5 at 2 pm"
-            dt.strftime("%A, %B %d at %I:%M %p").lower(),  # "monday, march 5 at 2:30 pm"
-            dt.strftime("%B %d at %I %p").lower(),  # "march 5 at 2 pm"
-            dt.strftime("%B %d at %I:%M %p").lower(),  # "march 5 at 2:30 pm"
-            dt.strftime("%I %p on %A").lower(),  # "2 pm on monday"
-            dt.strftime("%I:%M %p on %A").lower(),  # "2:30 pm on monday"
-            # Add support for "th" suffix in dates
-            dt.strftime("%A, %B %dth at %I %p").lower(),  # "saturday, july 26th at 10 am"
-            dt.strftime("%A, %B %dth at %I:%M %p").lower(),  # "saturday, july 26th at 10:30 am"
-            dt.strftime("%B %dth at %I %p").lower(),  # "july 26th at 10 am"
-            dt.strftime("%B %dth at %I:%M %p").lower(),  # "july 26th at 10:30 am"
-        ]
-        
-        # Check if any format matches
-        for fmt in formats_to_check:
-            if fmt in user_lower:
-                return time_str
-        
-        # Also check for partial matches (just day and time)
-        day_time_formats = [
-            f"{dt.strftime('%A').lower()} {dt.strftime('%I %p').lower().replace(' ', '')}",  # "monday 2pm"
-            f"{dt.strftime('%A').lower()} {dt.strftime('%I:%M %p').lower().replace(' ', '')}",  # "monday 2:30pm"
-            f"{dt.strftime('%A').lower()} at {dt.strftime('%I %p').lower()}",  # "monday at 2 pm"
-            f"{dt.strftime('%A').lower()} at {dt.strftime('%I:%M %p').lower()}",  # "monday at 2:30 pm"
-        ]
-        
-        for fmt in day_time_formats:
-            if fmt in user_lower:
-                return time_str
-        
-        # Check for just time patterns that might match
-        time_only_patterns = [
-            dt.strftime("%I %p").lower().replace(" ", ""),  # "2pm"
-            dt.strftime("%I:%M %p").lower().replace(" ", ""),  # "2:30pm"
-            dt.strftime("%I %p").lower(),  # "2 pm"
-            dt.strftime("%I:%M %p").lower(),  # "2:30 pm"
-        ]
-        
-        # If user just says a time, try to match it to any available time
-        for time_pattern in time_only_patterns:
-            if time_pattern in user_lower:
-                # Check if this is the only time mentioned (not part of a longer phrase)
-                # This is a simple heuristic - if the user just says "9 AM" or "9am"
-                if len(user_lower.split()) <= 3:  # Short phrases like "9 AM" or "9 am please"
-                    return time_str
-    
-    # If no exact match found, try fuzzy matching for day names
-    day_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    mentioned_days = [day for day in day_names if day in user_lower]
-    
-    if mentioned_days:
-        # Find times that match the mentioned day
-        for time_str in available_times:
-            dt = datetime.fromisoformat(time_str)
-            if dt.strftime("%A").lower() in mentioned_days:
-                # Check if the time is also mentioned
-                time_patterns = [
-                    r'\b\d{1,2}\s*(?:am|pm)\b',
-                    r'\b\d{1,2}:\d{2}\s*(?:am|pm)\b'
-                ]
-                for pattern in time_patterns:
-                    if re.search(pattern, user_lower):
-                        return time_str
-    
-    # If still no match, try to extract time and day separately
-    for time_str in available_times:
-        dt = datetime.fromisoformat(time_str)
-        day_name = dt.strftime("%A").lower()
-        time_str_formatted = dt.strftime("%I %p").lower()
-        time_str_formatted_no_space = dt.strftime("%I %p").lower().replace(" ", "")
-        
-        # Check if both day and time are mentioned
-        day_mentioned = day_name in user_lower
-        time_mentioned = (time_str_formatted in user_lower or 
-                         time_str_formatted_no_space in user_lower or
-                         f"{dt.strftime('%I')} am" in user_lower or
-                         f"{dt.strftime('%I')} pm" in user_lower)
-        
-        if day_mentioned and time_mentioned:
-            return time_str
-    
-    print(f"❌ No time match found for: '{user_text}'")
-    return None
+def _match_time_from_speech(user_text: str, available_times: List[str], index: Optional[Dict] = None) -> Optional[str]:
+    """Match a spoken time to one of the offered slots
+
+    `index` is the phrase index built when the slots were presented; states
+    saved before it existed get one built here.
+    """
+    if not index:
+        index = build_time_phrase_index(available_times)
+    chosen = match_time_phrase(user_text, available_times, index)
+    if not chosen:
+        print(f"❌ No time match found for: '{user_text}'")
+    return chosen
 
 def _parse_contact_from_speech(user_text: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
     """Parse name, email, and phone from speech text with improved robustness"""
@@ -709,6 +1101,13 @@ def _is_yes_response(text: str) -> bool:
     print(f"🔍 Yes detection - text: '{text}', is_yes: {is_yes}")
     return is_yes
 
+def asks_about_booking(text: str) -> bool:
+    """Check if text asks how a booking went (e.g. "did my call get booked?")"""
+    booking_words = ['book', 'appointment', 'call', 'schedul', 'reservation']
+    status_words = ['status', 'go through', 'went through', 'gone through', 'confirm', 'booked', 'scheduled', 'done', 'yet', 'any update', 'did it']
+    text_lower = text.lower().strip()
+    return any(word in text_lower for word in booking_words) and any(word in text_lower for word in status_words)
+
 def _is_no_response(text: str) -> bool:
     """Check if text indicates no/disagreement"""
     no_words = ['no', 'nope', 'nah', 'cancel', 'don\'t', 'not now', 'never mind', 'nevermind']
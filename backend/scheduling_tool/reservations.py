@@ -0,0 +1,165 @@
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+from sqlite_connections import ThreadConnections
+
+# ---------- Slot Reservation Ledger ----------
+
+# The SQLite backend deletes expired holds every this many holds
+PRUNE_EVERY_HOLDS = 64
+
+
+class MemoryReservationLedger:
+    """
+    Short-lived holds on offered slots, kept in process memory. A session
+    holds at most one slot; holding another releases the first. A slot can
+    be held by as many sessions as it has free agents (`capacity`), so a
+    slot offered by several agents stays available to others until every
+    agent is spoken for. Holds expire `ttl_seconds` after they are placed.
+    """
+
+    def __init__(self, ttl_seconds: float = 600):
+        self.ttl_seconds = ttl_seconds
+        self._holds: Dict[str, tuple] = {}  # session_id -> (slot, expires_at)
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.refused = 0
+
+    def _prune(self, now: float):
+        expired = [session_id for session_id, (_, expires_at) in self._holds.items() if expires_at <= now]
+        for session_id in expired:
+            del self._holds[session_id]
+
+    def hold(self, slot: str, session_id: str, capacity: int) -> bool:
+        """Hold `slot` for `session_id`; False if other sessions already fill its capacity"""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            current = self._holds.get(session_id)
+            if current is None or current[0] != slot:
+                others = sum(1 for held, _ in self._holds.values() if held == slot)
+                if others >= capacity:
+                    self.refused += 1
+                    return False
+            self._holds[session_id] = (slot, now + self.ttl_seconds)
+            self.granted += 1
+            return True
+
+    def release(self, session_id: str):
+        with self._lock:
+            self._holds.pop(session_id, None)
+
+    def held_counts(self, exclude_session: Optional[str] = None) -> Dict[str, int]:
+        """Live holds per slot, not counting `exclude_session`'s own"""
+        now = time.time()
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for session_id, (slot, expires_at) in self._holds.items():
+                if expires_at > now and session_id != exclude_session:
+                    counts[slot] = counts.get(slot, 0) + 1
+        return counts
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._prune(time.time())
+            return {
+                "backend": "memory",
+                "active_holds": len(self._holds),
+                "granted": self.granted,
+                "refused": self.refused,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+class SQLiteReservationLedger:
+    """
+    Same interface as MemoryReservationLedger, backed by a SQLite file so
+    holds placed on one uvicorn worker are seen by the others. The capacity
+    check and the insert run in one write transaction.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._db = ThreadConnections(path).get
+        self._lock = threading.Lock()
+        self._holds_placed = 0
+        self.granted = 0
+        self.refused = 0
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS slot_holds ("
+            "session_id TEXT PRIMARY KEY, slot TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db().execute("CREATE INDEX IF NOT EXISTS slot_holds_slot ON slot_holds (slot)")
+
+    def hold(self, slot: str, session_id: str, capacity: int) -> bool:
+        db = self._db()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers
+        # cannot both see a free place and both take it
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            others = db.execute(
+                "SELECT COUNT(*) FROM slot_holds WHERE slot = ? AND session_id != ? AND expires_at > ?",
+                (slot, session_id, now)
+            ).fetchone()[0]
+            current = db.execute(
+                "SELECT slot FROM slot_holds WHERE session_id = ? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+            granted = (current is not None and current[0] == slot) or others < capacity
+            if granted:
+                db.execute(
+                    "INSERT OR REPLACE INTO slot_holds (session_id, slot, expires_at) VALUES (?, ?, ?)",
+                    (session_id, slot, now + self.ttl_seconds)
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        with self._lock:
+            if granted:
+                self.granted += 1
+                self._holds_placed += 1
+                prune = self._holds_placed % PRUNE_EVERY_HOLDS == 0
+            else:
+                self.refused += 1
+                prune = False
+        if prune:
+            db.execute("DELETE FROM slot_holds WHERE expires_at <= ?", (time.time(),))
+        return granted
+
+    def release(self, session_id: str):
+        self._db().execute("DELETE FROM slot_holds WHERE session_id = ?", (session_id,))
+
+    def held_counts(self, exclude_session: Optional[str] = None) -> Dict[str, int]:
+        rows = self._db().execute(
+            "SELECT slot, COUNT(*) FROM slot_holds WHERE expires_at > ? AND session_id != ? GROUP BY slot",
+            (time.time(), exclude_session or "")
+        ).fetchall()
+        return dict(rows)
+
+    def stats(self) -> Dict:
+        count = self._db().execute(
+            "SELECT COUNT(*) FROM slot_holds WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "active_holds": count,
+                "granted": self.granted,
+                "refused": self.refused,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+def create_reservation_ledger():
+    """Backend picked by SLOT_HOLD_BACKEND ("memory" or "sqlite")"""
+    ttl_seconds = float(os.getenv("SLOT_HOLD_TTL_SECONDS", "600"))
+    backend = os.getenv("SLOT_HOLD_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.getenv("SLOT_HOLD_DB", "slot_holds.db")
+        print(f"📅 Slot holds stored in SQLite at {path}")
+        return SQLiteReservationLedger(path, ttl_seconds)
+    return MemoryReservationLedger(ttl_seconds)
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlite_connections import ThreadConnections
+
+# ---------- Scheduling Session Store ----------
+
+# The SQLite backend deletes expired sessions every this many writes
+PRUNE_EVERY_WRITES = 64
+
+
+class MemorySessionStore:
+    """
+    Scheduling states by session id, kept in process memory. Entries expire
+    `ttl_seconds` after their last write and the least recently used ones
+    are evicted past `max_sessions`. States are copied in and out, so a
+    caller mutating its copy never changes what is stored.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (json state, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+        return json.loads(entry[0])
+
+    def put(self, session_id: str, state: Dict[str, Any]):
+        entry = (json.dumps(state), time.time() + self.ttl_seconds)
+        with self._lock:
+            self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "ttl_seconds": self.ttl_seconds}
+
+
+class SQLiteSessionStore:
+    """
+    Same interface as MemorySessionStore, backed by a SQLite file so every
+    uvicorn worker on the host sees the same sessions.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 1800):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._db = ThreadConnections(path).get
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS scheduling_sessions ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute(
+            "SELECT state FROM scheduling_sessions WHERE id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id: str, state: Dict[str, Any]):
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO scheduling_sessions (id, state, expires_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), time.time() + self.ttl_seconds)
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY_WRITES == 0
+        if prune:
+            db.execute("DELETE FROM scheduling_sessions WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, session_id: str):
+        self._db().execute("DELETE FROM scheduling_sessions WHERE id = ?", (session_id,))
+
+    def stats(self) -> Dict:
+        count = self._db().execute(
+            "SELECT COUNT(*) FROM scheduling_sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+        return {"backend": "sqlite", "sessions": count, "ttl_seconds": self.ttl_seconds}
+
+
+def create_session_store():
+    """Backend picked by SCHEDULING_SESSION_BACKEND ("memory" or "sqlite")"""
+    ttl_seconds = float(os.getenv("SCHEDULING_SESSION_TTL_SECONDS", "1800"))
+    backend = os.getenv("SCHEDULING_SESSION_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.getenv("SCHEDULING_SESSION_DB", "scheduling_sessions.db")
+        print(f"📅 Scheduling sessions stored in SQLite at {path}")
+        return SQLiteSessionStore(path, ttl_seconds)
+    return MemorySessionStore(ttl_seconds, int(os.getenv("SCHEDULING_SESSION_MAX", "10000")))
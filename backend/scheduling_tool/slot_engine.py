@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ---------- Multi-Calendar Slot Engine ----------
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def merge_intervals(intervals: Iterable[tuple]) -> List[tuple]:
+    """Sort (start, end) intervals and merge the overlapping/touching ones"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_business_hours(spec: str) -> Tuple[time, time]:
+    """"09:00-17:00" -> (09:00, 17:00)"""
+    opens, closes = (time.fromisoformat(part.strip()) for part in spec.split("-"))
+    if closes <= opens:
+        raise ValueError(f"Business hours must close after they open: {spec!r}")
+    return opens, closes
+
+
+def parse_business_days(spec: str) -> List[int]:
+    """"mon,tue,wed" -> [0, 1, 2] (datetime.weekday numbers)"""
+    return [WEEKDAY_NAMES.index(day.strip().lower()[:3]) for day in spec.split(",") if day.strip()]
+
+
+class _BusyCursor:
+    """Walks one calendar's merged busy intervals alongside the slots (both in time order)"""
+
+    def __init__(self, intervals: List[tuple]):
+        self.intervals = intervals
+        self.i = 0
+
+    def busy_during(self, start: datetime, end: datetime) -> bool:
+        while self.i < len(self.intervals) and self.intervals[self.i][1] <= start:
+            self.i += 1
+        return self.i < len(self.intervals) and self.intervals[self.i][0] < end
+
+
+def open_slots(busy_by_agent: Dict[str, List[tuple]], blocked: List[tuple], tz, now: datetime,
+               horizon_days: int, opens: time, closes: time, business_days: Sequence[int],
+               slot_minutes: int) -> List[Tuple[datetime, List[str]]]:
+    """
+    Slots in business hours over the next `horizon_days` where at least one
+    agent is free, as `(start, free_agents)` in time order.
+
+    Every calendar's busy intervals are merged and sorted once; the slots are
+    then swept in time order with one forward-only cursor per calendar, so
+    the cost is O(slots x agents + busy intervals). `blocked` intervals (e.g.
+    a shared holiday calendar) make a slot unavailable for everyone.
+    """
+    slot_length = timedelta(minutes=slot_minutes)
+    agents = list(busy_by_agent)
+    cursors = {agent: _BusyCursor(merge_intervals(busy)) for agent, busy in busy_by_agent.items()}
+    blocked_cursor = _BusyCursor(merge_intervals(blocked))
+    slots = []
+    today = now.astimezone(tz).date()
+    for offset in range(horizon_days):
+        day = today + timedelta(days=offset)
+        if day.weekday() not in business_days:
+            continue
+        # Localize each day on its own so slots stay on the hour across DST changes
+        slot = tz.localize(datetime.combine(day, opens))
+        day_end = tz.localize(datetime.combine(day, closes))
+        while slot + slot_length <= day_end:
+            slot_end = slot + slot_length
+            if slot > now and not blocked_cursor.busy_during(slot, slot_end):
+                free = [agent for agent in agents if not cursors[agent].busy_during(slot, slot_end)]
+                if free:
+                    slots.append((slot, free))
+            slot = slot_end
+    return slots
+
+
+def window_bounds(tz, now: datetime, horizon_days: int, opens: time, closes: time) -> Tuple[datetime, datetime]:
+    """The span of time `open_slots` can cover, for the free/busy query"""
+    today = now.astimezone(tz).date()
+    return (tz.localize(datetime.combine(today, opens)),
+            tz.localize(datetime.combine(today + timedelta(days=horizon_days - 1), closes)))
+
+
+class RoundRobin:
+    """Hands bookings to agents in turn, skipping those busy at the slot"""
+
+    def __init__(self, agents: List[str]):
+        self.agents = list(agents)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def pick(self, free_agents: Iterable[str]) -> Optional[str]:
+        free = set(free_agents)
+        with self._lock:
+            for step in range(len(self.agents)):
+                position = (self._next + step) % len(self.agents)
+                if self.agents[position] in free:
+                    self._next = position + 1
+                    return self.agents[position]
+        return None
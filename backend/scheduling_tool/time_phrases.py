@@ -0,0 +1,106 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# ---------- Spoken-Time Phrase Index ----------
+
+# Phrase kinds; a chosen slot must agree with every kind the user mentioned
+# ("tuesday at 2 pm" needs a Tuesday slot at 2 PM, not any Tuesday slot)
+KINDS = ("day", "date", "time")
+
+# A weekday that matches no offered slot still counts as a mentioned day, so
+# "friday at 2 pm" does not fall back to some other day's 2 PM slot
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_AM_PM = re.compile(r"\b([ap])\.?\s?m\b\.?")        # "p.m." / "p. m." -> "pm"
+_GLUED_AM_PM = re.compile(r"(\d)(am|pm)\b")          # "2pm" -> "2 pm"
+_LEADING_ZERO = re.compile(r"(?<![:\d])0(\d)")       # "02 pm" -> "2 pm", keeps ":05"
+_NON_WORD = re.compile(r"[^\w:]+|(?<!\d):|:(?!\d)")  # keep ":" only inside times
+
+
+def normalize_utterance(text: str) -> List[str]:
+    """Lower-cased tokens with time spellings folded ("02:30PM" -> "2:30 pm")"""
+    text = _AM_PM.sub(r"\1m", text.lower())
+    text = _GLUED_AM_PM.sub(r"\1 \2", text)
+    text = _LEADING_ZERO.sub(r"\1", text)
+    return _NON_WORD.sub(" ", text).split()
+
+
+def _ordinal(day: int) -> str:
+    if 11 <= day % 100 <= 13:
+        return f"{day}th"
+    return f"{day}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th') }"
+
+
+def _slot_phrases(dt: datetime, today) -> Dict[str, List[str]]:
+    day = dt.strftime("%A").lower()
+    month = dt.strftime("%B").lower()
+    month_short = dt.strftime("%b").lower()
+    ordinal = _ordinal(dt.day)
+    hour = dt.hour % 12 or 12
+    ampm = "am" if dt.hour < 12 else "pm"
+    minutes = f"{dt.minute:02d}"
+
+    days = [day]
+    if dt.date() == today:
+        days.append("today")
+    elif dt.date() == today + timedelta(days=1):
+        days.append("tomorrow")
+
+    dates = [f"{m} {d}" for m in (month, month_short) for d in (dt.day, ordinal)]
+    dates += [f"{ordinal} of {month}", f"the {ordinal}"]
+
+    times = [f"{hour}:{minutes} {ampm}", f"{hour}:{minutes}"]
+    if dt.minute == 0:
+        times.append(f"{hour} {ampm}")
+        if dt.hour == 12:
+            times.append("noon")
+    return {"day": days, "date": dates, "time": times}
+
+
+def build_time_phrase_index(available_times: List[str], today=None) -> Dict:
+    """
+    Maps every way of saying each offered slot to the slots it could mean.
+    Built once when the slots are presented; JSON-serializable so it can be
+    kept in the schedule state:
+        {"day": {"monday": [0, 3]}, "date": {...}, "time": {"2 pm": [1]}, "max_words": 3}
+    Slot numbers are positions in `available_times`.
+    """
+    index = {kind: {} for kind in KINDS}
+    max_words = 1
+    for position, time_str in enumerate(available_times):
+        dt = datetime.fromisoformat(time_str)
+        for kind, phrases in _slot_phrases(dt, today or datetime.now(dt.tzinfo).date()).items():
+            for phrase in phrases:
+                slots = index[kind].setdefault(phrase, [])
+                if position not in slots:
+                    slots.append(position)
+                max_words = max(max_words, len(phrase.split()))
+    index["max_words"] = max_words
+    return index
+
+
+def match_time_phrase(user_text: str, available_times: List[str], index: Dict) -> Optional[str]:
+    """
+    One pass over the utterance's tokens, looking up every 1..max_words
+    token window in the index. Returns the earliest offered slot that agrees
+    with everything mentioned (day, date, time), or None.
+    """
+    tokens = normalize_utterance(user_text)
+    max_words = index.get("max_words", 3)
+    mentioned: Dict[str, set] = {}
+    for i in range(len(tokens)):
+        for n in range(1, min(max_words, len(tokens) - i) + 1):
+            phrase = " ".join(tokens[i:i + n])
+            for kind in KINDS:
+                slots = index[kind].get(phrase)
+                if slots:
+                    mentioned.setdefault(kind, set()).update(slots)
+        if tokens[i] in WEEKDAYS:
+            mentioned.setdefault("day", set())
+    if not mentioned:
+        return None
+    candidates = set.intersection(*mentioned.values())
+    if not candidates:
+        return None
+    return available_times[min(candidates)]
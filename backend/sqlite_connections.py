@@ -0,0 +1,25 @@
+import sqlite3
+import threading
+
+# ---------- Per-Thread SQLite Connections ----------
+
+class ThreadConnections:
+    """
+    Lazily opens one sqlite3 connection per thread to a database file
+    (sqlite3 connections are not shareable across threads). Connections run
+    in autocommit mode with WAL journaling, so several workers can read and
+    write the same file; callers take explicit locks with BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
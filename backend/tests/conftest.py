@@ -0,0 +1,29 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Tests import backend modules the way main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def run_together():
+    """Calls `fn(i)` from `count` threads released at once; returns the results in order"""
+    def run(count, fn):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(i):
+            barrier.wait()
+            results[i] = fn(i)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    return run
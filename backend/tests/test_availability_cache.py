@@ -0,0 +1,60 @@
+import pytest
+
+from scheduling_tool.availability_cache import AvailabilityCache
+from scheduling_tool.slot_engine import RoundRobin
+
+SLOT = "2030-01-07T10:00:00-06:00"
+SAME_SLOT_IN_UTC = "2030-01-07T16:00:00Z"
+UNCACHED_SLOT = "2030-01-08T10:00:00-06:00"
+AGENTS = ["a@x", "b@x"]
+
+
+def cache_with(agents, ttl_seconds=60):
+    cache = AvailabilityCache(ttl_seconds=ttl_seconds)
+    cache.put([(SLOT, agents)])
+    return cache
+
+
+def test_concurrent_claims_never_share_an_agent(run_together):
+    cache = cache_with(AGENTS)
+    rotation = RoundRobin(AGENTS)
+    claimed = run_together(10, lambda i: cache.claim(SLOT, rotation.pick))
+    assert sorted(agent for agent in claimed if agent) == AGENTS
+    assert cache.free_agents(SLOT) == []
+    assert cache.stats()["write_throughs"] == 2
+
+
+def test_slots_are_found_by_instant():
+    cache = cache_with(AGENTS)
+    assert cache.free_agents(SAME_SLOT_IN_UTC) == AGENTS
+    assert cache.claim(SAME_SLOT_IN_UTC, lambda free: free[0]) == "a@x"
+    assert cache.free_agents(SLOT) == ["b@x"]
+
+
+def test_a_slot_outside_the_cache_cannot_be_claimed():
+    cache = cache_with(AGENTS)
+    assert cache.free_agents(UNCACHED_SLOT) is None
+    with pytest.raises(LookupError):
+        cache.claim(UNCACHED_SLOT, lambda free: free[0])
+
+
+def test_a_fully_booked_slot_has_no_free_agent():
+    cache = cache_with(["a@x"])
+    assert cache.claim(SLOT, lambda free: free[0]) == "a@x"
+    assert cache.get() == []
+    assert cache.claim(SLOT, lambda free: free[0]) is None
+
+
+def test_release_rolls_back_a_claim():
+    cache = cache_with(["a@x"])
+    assert cache.claim(SLOT, lambda free: free[0]) == "a@x"
+    assert cache.get() == []
+    cache.release(SLOT, "a@x")
+    assert cache.free_agents(SLOT) == ["a@x"]
+    assert cache.get() == [SLOT]
+
+
+def test_get_or_load_without_a_ttl_returns_the_loaded_slots():
+    cache = AvailabilityCache(ttl_seconds=0)
+    assert cache.get_or_load(lambda: [(SLOT, AGENTS)]) == [SLOT]
+    assert cache.stats()["hits"] == 0
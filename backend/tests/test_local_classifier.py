@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from llm_moderation.local_classifier import LocalClassifier
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "llm_moderation", "local_classifier_model.json")
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return LocalClassifier.from_file(MODEL_PATH)
+
+
+def test_clears_known_benign_question(classifier):
+    cleared, probability = classifier.score("What is the APR on the card?")
+    assert cleared
+    assert probability >= classifier.threshold
+
+
+@pytest.mark.parametrize("text", [
+    # Familiar words around one the model has never seen still score as benign
+    "what is the APR on the card for nazis",
+    "how do I pay my bill with fentanyl",
+])
+def test_escalates_any_unknown_word(classifier, text):
+    cleared, probability = classifier.score(text)
+    assert probability >= classifier.threshold
+    assert not cleared
+
+
+def test_escalates_risk_terms(classifier):
+    assert classifier.score("how do I launder money with my card") == (False, 0.0)
@@ -0,0 +1,29 @@
+import pytest
+
+from llm_moderation.pattern_matcher import PatternMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return PatternMatcher({
+        "personal_info": ["social security number", "ssn"],
+        "financial_advice": ["security", "$100", "c++", "(abc)"],
+    })
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Is my SSN stored?", ["personal_info"]),
+    ("what is my social security number", ["personal_info", "financial_advice"]),
+    ("ssns and insecurity", []),
+    # Terms that start or end with punctuation
+    ("can I borrow $100 today", ["financial_advice"]),
+    ("I write C++ for a living", ["financial_advice"]),
+    ("see (abc) above", ["financial_advice"]),
+    ("pay $1000 or c++x", []),
+])
+def test_matches_whole_terms(matcher, text, expected):
+    assert matcher.match(text) == expected
+
+
+def test_empty_config_matches_nothing():
+    assert PatternMatcher({"x": []}).match("anything") == []
@@ -0,0 +1,32 @@
+import pytest
+
+from scheduling_tool.reservations import MemoryReservationLedger, SQLiteReservationLedger
+
+SLOT = "2030-01-07T10:00:00-06:00"
+
+
+# ---------- Slot holds ----------
+
+@pytest.fixture(params=["memory", "sqlite"])
+def ledger(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteReservationLedger(str(tmp_path / "holds.db"))
+    return MemoryReservationLedger()
+
+
+def test_concurrent_holds_stop_at_capacity(ledger, run_together):
+    granted = run_together(20, lambda i: ledger.hold(SLOT, f"session{i}", capacity=2))
+    assert sum(granted) == 2
+    assert ledger.held_counts() == {SLOT: 2}
+
+
+def test_hold_is_renewed_by_its_session_even_when_full(ledger):
+    assert ledger.hold(SLOT, "first", capacity=1)
+    assert not ledger.hold(SLOT, "second", capacity=1)
+    assert ledger.hold(SLOT, "first", capacity=1)
+
+
+def test_expired_hold_frees_the_slot():
+    ledger = MemoryReservationLedger(ttl_seconds=0)
+    assert ledger.hold(SLOT, "first", capacity=1)
+    assert ledger.hold(SLOT, "second", capacity=1)
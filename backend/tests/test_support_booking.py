@@ -0,0 +1,166 @@
+import os
+
+import pytest
+
+# google_calendar picks its calendar backend at import time
+os.environ.setdefault("CALENDAR_BACKEND", "fake")
+os.environ.setdefault("CALENDAR_MOCK_FALLBACK", "false")
+
+import scheduling_tool.google_calendar as gc
+from scheduling_tool.availability_cache import AvailabilityCache
+from scheduling_tool.booking_queue import BookingQueue
+from scheduling_tool.fake_calendar import FakeCalendar, FakeCalendarClient, _http_error
+from scheduling_tool.reservations import MemoryReservationLedger
+from scheduling_tool.session_store import MemorySessionStore, SQLiteSessionStore
+from scheduling_tool.slot_engine import RoundRobin
+
+SLOT = "2030-01-07T10:00:00-06:00"
+AGENTS = ["a@x", "b@x"]
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """An empty fake calendar for AGENTS, with a warm availability cache"""
+    calendar = FakeCalendar()
+    cache = AvailabilityCache(ttl_seconds=60)
+    cache.put([(SLOT, AGENTS)])
+    monkeypatch.setattr(gc, "calendar_client", FakeCalendarClient(calendar))
+    monkeypatch.setattr(gc, "availability_cache", cache)
+    monkeypatch.setattr(gc, "session_store", MemorySessionStore())
+    monkeypatch.setattr(gc, "agent_rotation", RoundRobin(AGENTS))
+    monkeypatch.setattr(gc, "SUPPORT_AGENT_CALENDARS", list(AGENTS))
+    return calendar
+
+
+def request(key="key1", slot=SLOT):
+    return gc.ScheduleRequest(name="Jane Doe", email="jane@example.com", datetime=slot, idempotency_key=key)
+
+
+def events(calendar):
+    return {agent: len(calendar.stored(agent)) for agent in AGENTS}
+
+
+def fail_next_insert(calendar, error, after_insert=False):
+    """The next insert raises `error`, optionally after the event was stored"""
+    insert = calendar.insert
+
+    def failing(calendar_id, body):
+        calendar.insert = insert
+        if after_insert:
+            insert(calendar_id, body)
+        raise error
+
+    calendar.insert = failing
+
+
+def test_concurrent_bookings_of_one_slot_use_distinct_agents(calendar, run_together):
+    results = run_together(4, lambda i: gc.schedule_support_event(request(f"key{i}")))
+    assert sorted(result["agent"] for result in results if "error" not in result) == AGENTS
+    assert events(calendar) == {"a@x": 1, "b@x": 1}
+
+
+def test_booking_in_another_offset_claims_the_cached_slot(calendar):
+    result = gc.schedule_support_event(request(slot="2030-01-07T16:00:00Z"))
+    assert result["agent"] == "a@x"
+    assert gc.availability_cache.free_agents(SLOT) == ["b@x"]
+
+
+def test_booking_outside_the_cache_checks_the_calendar(calendar):
+    calendar.insert("a@x", {"start": {"dateTime": "2030-01-08T10:00:00-06:00"},
+                            "end": {"dateTime": "2030-01-08T10:30:00-06:00"}})
+    result = gc.schedule_support_event(request(slot="2030-01-08T10:00:00-06:00"))
+    assert result["agent"] == "b@x"
+
+
+def test_rejected_insert_releases_the_claimed_agent(calendar):
+    fail_next_insert(calendar, _http_error(403, "Forbidden"))
+    assert "error" in gc.schedule_support_event(request())
+    assert sorted(gc.availability_cache.free_agents(SLOT)) == AGENTS
+
+
+def test_timed_out_insert_keeps_the_agent_busy(calendar):
+    fail_next_insert(calendar, TimeoutError("timed out"), after_insert=True)
+    assert "error" in gc.schedule_support_event(request())
+    assert gc.availability_cache.free_agents(SLOT) == ["b@x"]
+
+
+@pytest.mark.parametrize("agents", [AGENTS, AGENTS[:1]])
+def test_retry_after_timeout_does_not_book_twice(calendar, monkeypatch, agents):
+    monkeypatch.setattr(gc, "SUPPORT_AGENT_CALENDARS", list(agents))
+    gc.availability_cache.put([(SLOT, agents)])
+    fail_next_insert(calendar, TimeoutError("timed out"), after_insert=True)
+    assert "error" in gc.schedule_support_event(request())
+
+    retried = gc.schedule_support_event(request())
+    assert "error" not in retried
+    assert retried["agent"] == "a@x"
+    assert sum(events(calendar).values()) == 1
+
+
+# ---------- Acknowledging a confirmed booking ----------
+
+@pytest.fixture
+def queue(calendar, monkeypatch):
+    """A booking queue of our own, sharing statuses through gc.session_store"""
+    queue = BookingQueue(gc.schedule_support_event, publish=gc._share_booking_status)
+    monkeypatch.setattr(gc, "booking_queue", queue)
+    monkeypatch.setattr(gc, "reservation_ledger", MemoryReservationLedger())
+    return queue
+
+
+def confirm(session_id="session1"):
+    """Say yes at the confirmation step of a session that chose SLOT"""
+    gc.session_store.put(session_id, {
+        "active": True, "stage": "confirming", "session_id": session_id, "chosen_time": SLOT,
+        "name": "Jane Doe", "email": "jane@example.com", "phone": "555-0100"
+    })
+    return gc.continue_scheduling_flow("yes", {"active": True, "stage": "confirming", "session_id": session_id})
+
+
+def test_pending_booking_ends_the_session(calendar, queue):
+    calendar.latency_ms = 200
+    reply = confirm()
+    assert reply["message"] == gc.BOOKING_PENDING_MESSAGE
+    assert reply["done"] and reply["schedule_state"] is None
+    assert reply["booking"]["status"] == "pending"
+    assert queue.wait(reply["booking"]["key"], 5)["status"] == "booked"
+
+
+def test_late_outcome_is_reported_when_asked(queue):
+    key = confirm()["booking"]["key"]
+    queue.wait(key, 5)
+    assert not gc.asks_about_booking("What is the interest rate?")
+    assert gc.asks_about_booking("Did my call get booked?")
+    reply = gc.booking_followup(key)
+    assert reply["message"] == gc.BOOKED_MESSAGE
+    assert reply["booking"]["status"] == "booked"
+
+
+def test_late_failure_offers_other_times(calendar, queue):
+    calendar.latency_ms = 100
+    fail_next_insert(calendar, _http_error(403, "Forbidden"))
+    key = confirm()["booking"]["key"]
+    assert queue.wait(key, 5)["status"] == "failed"
+    reply = gc.booking_followup(key)
+    assert reply["stage"] == "awaiting_time"
+    assert gc.session_store.get(reply["schedule_state"]["session_id"])["stage"] == "awaiting_time"
+
+
+def test_another_worker_reports_the_outcome(queue, monkeypatch, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    monkeypatch.setattr(gc, "session_store", SQLiteSessionStore(path))
+    key = confirm()["booking"]["key"]
+    queue.wait(key, 5)
+    # Its own (empty) booking queue, the same session database
+    monkeypatch.setattr(gc, "booking_queue", BookingQueue(gc.schedule_support_event))
+    monkeypatch.setattr(gc, "session_store", SQLiteSessionStore(path))
+    assert gc.get_booking_status(key)["status"] == "booked"
+    assert gc.booking_followup(key)["message"] == gc.BOOKED_MESSAGE
+
+
+def test_resent_state_of_an_ended_session_only_answers_about_the_booking(queue):
+    key = confirm()["booking"]["key"]
+    queue.wait(key, 5)
+    resent = {"active": True, "stage": "confirming", "session_id": "session1"}
+    assert gc.continue_scheduling_flow("What is the interest rate?", resent) is None
+    assert gc.continue_scheduling_flow("yes", resent)["booking"]["status"] == "booked"
@@ -0,0 +1,130 @@
+import os
+import time
+import uuid
+import heapq
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# ---------- Per-Request Stage Tracing ----------
+
+# How many of the slowest requests to keep, and the minimum duration for a
+# request to be considered at all (0 keeps the slowest N of everything)
+TRACE_SLOW_BUFFER_SIZE = int(os.getenv("TRACE_SLOW_BUFFER_SIZE", "50"))
+TRACE_SLOW_MIN_MS = float(os.getenv("TRACE_SLOW_MIN_MS", "0"))
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """A request waterfall: named spans with offsets relative to the request start"""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms = 0.0
+        self.spans: List[Dict] = []  # appended from worker threads too (list.append is atomic)
+
+    def elapsed_ms(self, since: Optional[float] = None) -> float:
+        return ((since if since is not None else time.perf_counter()) - self._t0) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"])
+        }
+
+
+class SlowTraceBuffer:
+    """Keeps the N slowest finished traces (min-heap on duration)"""
+
+    def __init__(self, size: int, min_ms: float = 0.0):
+        self.size = size
+        self.min_ms = min_ms
+        self._heap = []
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def offer(self, trace: Trace):
+        if self.size <= 0 or trace.duration_ms < self.min_ms:
+            return
+        entry = (trace.duration_ms, trace.trace_id, trace)
+        with self._lock:
+            self.recorded += 1
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            traces = sorted(self._heap, key=lambda e: e[0], reverse=True)
+        return [t.to_dict() for _, _, t in traces[:limit]]
+
+
+slow_traces = SlowTraceBuffer(TRACE_SLOW_BUFFER_SIZE, TRACE_SLOW_MIN_MS)
+
+
+def finish_trace(trace: Trace):
+    """Close `trace` and offer it to the slow-trace buffer"""
+    trace.duration_ms = trace.elapsed_ms()
+    slow_traces.offer(trace)
+
+
+@contextmanager
+def resume_trace(trace: Trace, finish: bool = True):
+    """
+    Make `trace` current for this block. With `finish=False` it stays open
+    afterwards, so a later block (e.g. the body of a streaming response,
+    which runs after the handler returns) can add spans and close it.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if finish:
+            finish_trace(trace)
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """Trace everything in this block (and in `run_blocking` calls made from it)"""
+    with resume_trace(Trace(name, **attrs)) as trace:
+        yield trace
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record one stage of the current request; a no-op outside a trace"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = {
+            "name": name,
+            "start_ms": round(trace.elapsed_ms(start), 2),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "thread": threading.current_thread().name
+        }
+        if attrs:
+            record["attrs"] = attrs
+        if error:
+            record["error"] = error
+        trace.spans.append(record)
@@ -0,0 +1,58 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# ---------- Per-Upstream Concurrency Limits ----------
+
+# Maximum number of in-flight calls per upstream service. Async clients are
+# gated by a semaphore of this size, blocking SDKs get a thread pool of it.
+UPSTREAM_LIMITS = {
+    "llm": int(os.getenv("LLM_CONCURRENCY", "32")),
+    "audio": int(os.getenv("AUDIO_CONCURRENCY", "16")),
+    "pinecone": int(os.getenv("PINECONE_CONCURRENCY", "32")),
+    "moderation": int(os.getenv("MODERATION_CONCURRENCY", "32")),
+    "calendar": int(os.getenv("CALENDAR_CONCURRENCY", "8")),
+}
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def upstream_slot(name: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore bounding concurrent async calls to an upstream.
+    Use as `async with upstream_slot("llm"): ...`.
+    """
+    if name not in _semaphores:
+        _semaphores[name] = asyncio.Semaphore(UPSTREAM_LIMITS[name])
+    return _semaphores[name]
+
+
+def _executor(name: str) -> ThreadPoolExecutor:
+    if name not in _executors:
+        _executors[name] = ThreadPoolExecutor(
+            max_workers=UPSTREAM_LIMITS[name],
+            thread_name_prefix=f"upstream-{name}"
+        )
+    return _executors[name]
+
+
+async def run_blocking(name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs a blocking call on the bounded thread pool of an upstream so the
+    event loop keeps serving other requests while it waits.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_executor(name), call)
+
+
+def shutdown_upstreams():
+    """Stops all upstream thread pools (called on server shutdown)"""
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
@@ -0,0 +1,47 @@
+import re
+from typing import List
+
+# ---------- Incremental Sentence Splitting ----------
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a line break
+# (bullet points). Decimals like "7.49%" have no whitespace after the dot.
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Fragments shorter than this are merged into the next sentence so TTS is
+# not called for things like "1." or "Sure!"
+MIN_SENTENCE_CHARS = 20
+
+
+class SentenceSplitter:
+    """
+    Cuts a token stream into speakable sentences as soon as they are
+    complete. `feed` returns the sentences finished by the new text, and
+    `flush` returns whatever is left once the stream ends.
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for boundary in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:boundary.start()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = boundary.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> List[str]:
+    """Splits a complete text the same way the streaming splitter would"""
+    splitter = SentenceSplitter(min_chars)
+    return splitter.feed(text) + splitter.flush()
@@ -0,0 +1,162 @@
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# ---------- Synthesized Audio Cache ----------
+
+# The disk tier is scanned for pruning every this many writes, not on each one
+PRUNE_EVERY_WRITES = 32
+
+class TTSCache:
+    """
+    Caches synthesized audio keyed by (normalized text, voice, speed, format).
+
+    The memory tier is an LRU bounded by total audio bytes. The optional disk
+    tier (`disk_dir`) survives restarts and is shared by workers on the same
+    host; it is pruned oldest-first once it grows past `disk_max_bytes`.
+    From the event loop use `get_async`/`put_async`, which keep disk reads,
+    writes and pruning off the loop.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_writes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, voice: str, speed: float, fmt: str) -> str:
+        normalized = re.sub(r"\s+", " ", text).strip()
+        raw = f"{normalized}\x00{voice}\x00{speed:.2f}\x00{fmt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.audio")
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = audio
+            self._bytes += len(audio)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return audio
+
+    def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory_get(key)
+        if audio is not None:
+            return audio
+        if not self.disk_dir:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self._disk_get(key)
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        """Disk-tier lookup (blocking); counts the miss when the file is absent"""
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                audio = f.read()
+            self._remember(key, audio)
+            with self._lock:
+                self.disk_hits += 1
+            return audio
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ TTS disk cache read failed: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes):
+        self._remember(key, audio)
+        if self.disk_dir:
+            try:
+                path = self._disk_path(key)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp, path)
+                with self._lock:
+                    self._disk_writes += 1
+                    prune = self._disk_writes % PRUNE_EVERY_WRITES == 0
+                if prune:
+                    self._prune_disk()
+            except Exception as e:
+                print(f"⚠️ TTS disk cache write failed: {e}")
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        """`get` for async callers: memory hits are served inline, disk reads run on a worker thread"""
+        audio = self._memory_get(key)
+        if audio is not None:
+            return audio
+        if not self.disk_dir:
+            with self._lock:
+                self.misses += 1
+            return None
+        return await asyncio.to_thread(self._disk_get, key)
+
+    async def put_async(self, key: str, audio: bytes):
+        """`put` for async callers: the disk write (and any pruning) runs on a worker thread"""
+        if self.disk_dir:
+            await asyncio.to_thread(self.put, key, audio)
+        else:
+            self.put(key, audio)
+
+    def _prune_disk(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".audio"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_enabled": bool(self.disk_dir)
+            }
@@ -0,0 +1,33 @@
+# embed_chunks.py
+
+import os
+import json
+import numpy as np
+from openai import OpenAI
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+load_dotenv()
+
+# Must match EMBEDDING_MODEL in backend/main.py (queries are embedded with it)
+EMBEDDING_MODEL = "text-embedding-3-small"
+BATCH_SIZE = 100
+
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+with open("aven_data/aven_chunked.json", "r") as f:
+    chunks = json.load(f)
+
+print(f"🔄 Embedding {len(chunks)} chunks with {EMBEDDING_MODEL}...")
+
+vectors = []
+for i in tqdm(range(0, len(chunks), BATCH_SIZE)):
+    batch = [chunk["text"] for chunk in chunks[i:i + BATCH_SIZE]]
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=batch)
+    vectors.extend(item.embedding for item in response.data)
+
+# Rows are aligned with aven_chunked.json, which the backend's local index loads alongside
+embeddings = np.asarray(vectors, dtype=np.float32)
+np.savez("aven_data/aven_embeddings.npz", embeddings=embeddings, model=EMBEDDING_MODEL)
+
+print(f"\n✅ Saved {embeddings.shape[0]} x {embeddings.shape[1]} embeddings to aven_data/aven_embeddings.npz")
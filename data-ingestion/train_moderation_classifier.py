@@ -0,0 +1,113 @@
+# train_moderation_classifier.py
+
+import os
+import sys
+import json
+import math
+import random
+from collections import Counter
+
+# Featurization must match the backend exactly, so reuse its module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from llm_moderation.local_classifier import LocalClassifier, tokenize, features
+
+MODEL_PATH = "../backend/llm_moderation/local_classifier_model.json"
+CORPUS_DIR = "moderation_corpus"
+
+# Features seen fewer times than this across both classes are dropped
+MIN_FEATURE_COUNT = 1
+# Laplace smoothing
+ALPHA = 0.5
+# Longer messages always go to the remote API
+MAX_TOKENS = 40
+# Messages where more than this share of words are new to the model are
+# escalated. Zero: a single unseen word (a slur, a new drug name) can carry
+# the whole risk while the familiar words around it look benign.
+MAX_UNKNOWN_RATIO = 0.0
+# The threshold sits this far above the most benign-looking held-out risky message
+THRESHOLD_MARGIN = 0.02
+MIN_THRESHOLD = 0.98
+FOLDS = 5
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def train(benign, risky, risk_terms):
+    counts = [Counter(), Counter()]
+    vocabulary = set()
+    for label, texts in enumerate((benign, risky)):
+        for text in texts:
+            tokens = tokenize(text)
+            vocabulary.update(tokens)
+            counts[label].update(features(tokens))
+
+    totals = counts[0] + counts[1]
+    kept = [f for f, n in totals.items() if n >= MIN_FEATURE_COUNT]
+    denominators = [sum(counts[label][f] for f in kept) + ALPHA * len(kept) for label in (0, 1)]
+    log_likelihood = {
+        f: [round(math.log((counts[label][f] + ALPHA) / denominators[label]), 5) for label in (0, 1)]
+        for f in kept
+    }
+    return {
+        "version": 1,
+        "classes": ["benign", "risky"],
+        "log_prior": [math.log(len(benign) / (len(benign) + len(risky))),
+                      math.log(len(risky) / (len(benign) + len(risky)))],
+        "log_likelihood": log_likelihood,
+        "vocabulary": sorted(vocabulary),
+        "risk_terms": sorted(risk_terms),
+        "threshold": MIN_THRESHOLD,
+        "max_unknown_ratio": MAX_UNKNOWN_RATIO,
+        "max_tokens": MAX_TOKENS
+    }
+
+
+def folds(texts):
+    texts = texts[:]
+    random.Random(42).shuffle(texts)
+    return [texts[i::FOLDS] for i in range(FOLDS)]
+
+
+with open("evaluation_set/evaluation_set.json", "r") as f:
+    benign = [item["question"] for item in json.load(f)]
+benign += read_lines(os.path.join(CORPUS_DIR, "benign.txt"))
+risky = read_lines(os.path.join(CORPUS_DIR, "risky.txt"))
+risk_terms = read_lines(os.path.join(CORPUS_DIR, "risk_terms.txt"))
+
+print(f"🔄 Training on {len(benign)} benign and {len(risky)} risky messages...")
+
+# Cross-validate to pick the threshold on messages the model has not seen
+benign_folds, risky_folds = folds(benign), folds(risky)
+risky_scores = []
+benign_held_out = []
+for i in range(FOLDS):
+    model = train(
+        [t for j, fold in enumerate(benign_folds) if j != i for t in fold],
+        [t for j, fold in enumerate(risky_folds) if j != i for t in fold],
+        risk_terms
+    )
+    classifier = LocalClassifier(model, threshold=0.0)
+    # Risky messages already caught by the lexicon do not constrain the threshold
+    risky_scores += [p for cleared, p in map(classifier.score, risky_folds[i]) if cleared]
+    benign_held_out += [(classifier, text) for text in benign_folds[i]]
+
+threshold = min(0.999, max(MIN_THRESHOLD, max(risky_scores, default=0.0) + THRESHOLD_MARGIN))
+held_out_cleared = 0
+for classifier, text in benign_held_out:
+    classifier.threshold = threshold
+    held_out_cleared += classifier.score(text)[0]
+
+model = train(benign, risky, risk_terms)
+model["threshold"] = round(threshold, 4)
+with open(MODEL_PATH, "w", encoding="utf-8") as f:
+    json.dump(model, f, separators=(",", ":"))
+
+final = LocalClassifier(model)
+risky_cleared = sum(final.score(text)[0] for text in risky)
+print(f"📊 Threshold: {threshold:.4f} (highest held-out risky score: {max(risky_scores, default=0.0):.4f})")
+print(f"📊 Held-out benign skip rate: {held_out_cleared / len(benign_held_out):.1%}")
+print(f"📊 Training risky messages cleared locally: {risky_cleared}")
+print(f"\n✅ Saved model ({len(model['log_likelihood'])} features) to {MODEL_PATH}")
@@ -2,6 +2,7 @@
 
 import os
 import json
+import requests
 from pinecone import Pinecone
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -31,3 +32,16 @@ for i in tqdm(range(0, len(chunks), BATCH_SIZE)):
     index.upsert_records(namespace, records)
 
 print(f"\n✅ Uploaded {len(chunks)} records using Pinecone SDK v3 integrated embedding.")
+
+# Re-ingestion makes cached answers stale, so tell the backend to drop them
+API_URL = os.getenv("NEXT_PUBLIC_API_URL")
+if API_URL:
+    headers = {}
+    if os.getenv("CACHE_ADMIN_TOKEN"):
+        headers["X-Admin-Token"] = os.getenv("CACHE_ADMIN_TOKEN")
+    try:
+        r = requests.post(f"{API_URL}/cache/invalidate", headers=headers, timeout=10)
+        r.raise_for_status()
+        print(f"🧹 Answer cache invalidated: {r.json()}")
+    except Exception as e:
+        print(f"⚠️ Could not invalidate answer cache: {e}")